@@ -0,0 +1,8 @@
+"""SentinelMesh benchmarks: synthetic load, micro-benchmarks and an end-to-end harness.
+
+Run from the repository root:
+
+    python -m bench.micro
+    python -m bench.e2e --target inprocess
+    python -m bench.e2e --target compose --gateway http://localhost:8001 --core http://localhost:8002
+"""
@@ -0,0 +1,209 @@
+"""End-to-end load harness: reports in at the gateway, route assignments out.
+
+    python -m bench.e2e --target inprocess --rate 500 --duration 20 --profile burst
+    python -m bench.e2e --target compose --gateway http://localhost:8001 --core http://localhost:8002
+
+The load is open-loop: each report has an intended send time taken from the
+arrival profile, and latency is measured from that intended time to the
+moment its `dispatch.route_assigned` event is observed (matched on
+`trace_id`), so client-side queueing is not hidden.
+
+- `inprocess` imports gateway, ai-engine, core-service and dispatch-service
+  into this interpreter, wired through the shared `memory` (or `log`)
+  transport and a SQLite stand-in for Postgres. Requires the services'
+  Python dependencies.
+- `compose` drives the docker-compose stack over HTTP and watches dispatches
+  on core-service's `/v1/incidents/stream` feed. Needs only the stdlib.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from .generators import GeoModel, ReportMix, arrival_offsets, generate_reports
+from .services import import_from
+from .standins import sqlite_psycopg2
+from .stats import summarize
+
+
+class DispatchWatcher:
+    """Collects first-seen monotonic timestamps of dispatched trace ids."""
+
+    def __init__(self):
+        self.seen: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, trace_id: str | None):
+        if not trace_id:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self.seen.setdefault(trace_id, now)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self.seen)
+
+
+class InProcessTarget:
+    def __init__(self, transport: str = "memory"):
+        os.environ["TRANSPORT_BACKEND"] = transport
+        if transport == "log":
+            os.environ["TRANSPORT_LOG_DIR"] = tempfile.mkdtemp(prefix="sentinelmesh-log-")
+        os.environ.setdefault("METRICS_PORT", "0")  # ephemeral ports for worker /metrics servers
+        sys.modules["psycopg2"] = sqlite_psycopg2()
+
+        import grpc
+
+        dispatch = import_from("dispatch-service", "server")
+        self._grpc_server = grpc.server(ThreadPoolExecutor(max_workers=10), options=dispatch.SERVER_OPTIONS)
+        dispatch.dispatch_pb2_grpc.add_DispatchServiceServicer_to_server(
+            dispatch.DispatchSvc(), self._grpc_server
+        )
+        port = self._grpc_server.add_insecure_port("127.0.0.1:0")
+        self._grpc_server.start()
+        os.environ["DISPATCH_GRPC_TARGET"] = f"127.0.0.1:{port}"
+
+        from sentinelmesh.transport import build_consumer  # after TRANSPORT_BACKEND is set
+
+        core = import_from("core-service", "consumer")
+        ai = import_from("ai-engine", "main")
+        self._gateway = import_from("gateway", "main")
+        threading.Thread(target=core.run, daemon=True).start()
+        threading.Thread(target=ai.main, daemon=True).start()
+
+        self.watcher = DispatchWatcher()
+        dispatched = build_consumer(None, core.TOPIC_DISPATCH, group_id="bench-e2e")
+        threading.Thread(target=self._watch, args=(dispatched,), daemon=True).start()
+
+    def _watch(self, consumer):
+        for msg in consumer:
+            self.watcher.record(msg.value.get("trace_id"))
+
+    def send(self, report: dict) -> str | None:
+        gw = self._gateway
+        try:
+            return gw.report(gw.EmergencyReport(**report))["trace_id"]
+        except gw.HTTPException:
+            return None  # rejected by admission control
+
+
+class ComposeTarget:
+    def __init__(self, gateway: str, core: str):
+        self._url = gateway.rstrip("/") + "/v1/emergency/report"
+        self.watcher = DispatchWatcher()
+        stream = urllib.request.urlopen(core.rstrip("/") + "/v1/incidents/stream")
+        threading.Thread(target=self._watch, args=(stream,), daemon=True).start()
+
+    def _watch(self, stream):
+        event = None
+        for raw in stream:
+            line = raw.decode("utf-8").rstrip("\n")
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event == "route_assigned":
+                self.watcher.record(json.loads(line[6:]).get("trace_id"))
+
+    def send(self, report: dict) -> str | None:
+        req = urllib.request.Request(
+            self._url, data=json.dumps(report).encode("utf-8"), headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                return json.load(resp)["trace_id"]
+        except urllib.error.HTTPError:
+            return None  # rejected (e.g. shed by the gateway)
+
+
+def run(target, reports: list[dict], offsets: list[float], concurrency: int, drain_s: float) -> dict:
+    sent: dict[str, tuple[float, bool]] = {}
+    rejected = 0
+    lock = threading.Lock()
+
+    def send_one(report, intended):
+        nonlocal rejected
+        trace_id = target.send(report)
+        with lock:
+            if trace_id is None:
+                rejected += 1
+            else:
+                sent[trace_id] = (intended, report["emergency"])
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for report, offset in zip(reports, offsets):
+            delay = start + offset - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send_one, report, start + offset)
+    send_elapsed = time.monotonic() - start
+
+    expected = sum(1 for _, emergency in sent.values() if emergency)
+    deadline = time.monotonic() + drain_s
+    while target.watcher.count() < expected and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    latencies, last = [], start
+    for trace_id, seen_at in list(target.watcher.seen.items()):
+        if trace_id in sent:
+            latencies.append(seen_at - sent[trace_id][0])
+            last = max(last, seen_at)
+
+    return {
+        "reports_sent": len(sent) + rejected,
+        "reports_rejected": rejected,
+        "accept_rate_per_s": len(sent) / send_elapsed if send_elapsed else 0.0,
+        "emergencies_expected": expected,
+        "dispatched": len(latencies),
+        "dispatch_rate_per_s": len(latencies) / (last - start) if last > start else 0.0,
+        "report_to_dispatch_s": summarize(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=("inprocess", "compose"), default="inprocess")
+    parser.add_argument("--transport", choices=("memory", "log"), default="memory", help="inprocess only")
+    parser.add_argument("--gateway", default="http://localhost:8001")
+    parser.add_argument("--core", default="http://localhost:8002")
+    parser.add_argument("--rate", type=float, default=200.0, help="mean reports per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--profile", choices=("constant", "poisson", "burst", "ramp"), default="constant")
+    parser.add_argument("--mix", default="gunshot=0.1,panic=0.2,manual=0.3,non_emergency=0.4")
+    parser.add_argument("--hotspots", type=int, default=5)
+    parser.add_argument("--clustered", type=float, default=0.6, help="share of reports near a hotspot")
+    parser.add_argument("--concurrency", type=int, default=64, help="sender threads")
+    parser.add_argument("--drain", type=float, default=30.0, help="seconds to wait for late dispatches")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args(argv)
+
+    offsets = list(arrival_offsets(args.profile, args.rate, args.duration, seed=args.seed))
+    geo = GeoModel(hotspots=args.hotspots, clustered=args.clustered)
+    reports = list(generate_reports(len(offsets), ReportMix.parse(args.mix), geo, seed=args.seed))
+
+    target = InProcessTarget(args.transport) if args.target == "inprocess" else ComposeTarget(args.gateway, args.core)
+    result = run(target, reports, offsets, args.concurrency, args.drain)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    lat = result["report_to_dispatch_s"]
+    print(f"target={args.target} transport={args.transport} profile={args.profile} rate={args.rate}/s duration={args.duration}s")
+    print(f"sent={result['reports_sent']} rejected={result['reports_rejected']} "
+          f"accepted/s={result['accept_rate_per_s']:.1f}")
+    print(f"dispatched={result['dispatched']}/{result['emergencies_expected']} "
+          f"dispatch/s={result['dispatch_rate_per_s']:.1f}")
+    print(f"report->dispatch ms: p50={lat['p50'] * 1e3:.1f} p99={lat['p99'] * 1e3:.1f} "
+          f"p999={lat['p999'] * 1e3:.1f} max={lat['max'] * 1e3:.1f}")
+
+
+if __name__ == "__main__":
+    main()
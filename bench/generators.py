@@ -0,0 +1,138 @@
+"""Synthetic citizen reports and arrival schedules.
+
+Reports are plain dicts shaped like the gateway's `EmergencyReport` body, so
+they can be POSTed as JSON or passed to the model constructor directly.
+Everything is driven by a seeded `random.Random` for reproducible runs.
+"""
+
+import random
+from dataclasses import dataclass, field
+
+# Report kinds and the `EmergencyReport` fields each one sets.
+KINDS = {
+    "gunshot": {"emergency": True, "audio_signature": "gunshot_like", "panic_motion": False},
+    "panic": {"emergency": True, "audio_signature": None, "panic_motion": True},
+    "manual": {"emergency": True, "audio_signature": None, "panic_motion": False},
+    "non_emergency": {"emergency": False, "audio_signature": None, "panic_motion": False},
+}
+
+
+@dataclass
+class ReportMix:
+    """Relative weights of each report kind."""
+
+    gunshot: float = 0.10
+    panic: float = 0.20
+    manual: float = 0.30
+    non_emergency: float = 0.40
+
+    @classmethod
+    def parse(cls, spec: str) -> "ReportMix":
+        """Parse `gunshot=1,panic=2,...`; omitted kinds get weight 0."""
+        weights = {k: 0.0 for k in KINDS}
+        for part in filter(None, spec.split(",")):
+            name, _, value = part.partition("=")
+            if name.strip() not in weights:
+                raise ValueError(f"unknown report kind {name!r}; use {', '.join(KINDS)}")
+            weights[name.strip()] = float(value)
+        return cls(**weights)
+
+    def weights(self) -> list[float]:
+        return [getattr(self, k) for k in KINDS]
+
+
+@dataclass
+class GeoModel:
+    """Reports fall around `hotspots` with probability `clustered`, else uniformly in the box."""
+
+    center: tuple[float, float] = (20.6736, -103.344)  # Guadalajara, as in the README smoke test
+    radius_deg: float = 0.15
+    hotspots: int = 5
+    hotspot_sigma_deg: float = 0.002
+    clustered: float = 0.6
+    _centers: list[tuple[float, float]] = field(default_factory=list, repr=False)
+
+    def seed(self, rng: random.Random):
+        lat0, lon0 = self.center
+        self._centers = [self._uniform(rng, lat0, lon0) for _ in range(self.hotspots)]
+
+    def sample(self, rng: random.Random) -> tuple[float, float]:
+        if self._centers and rng.random() < self.clustered:
+            lat, lon = rng.choice(self._centers)
+            return rng.gauss(lat, self.hotspot_sigma_deg), rng.gauss(lon, self.hotspot_sigma_deg)
+        return self._uniform(rng, *self.center)
+
+    def _uniform(self, rng: random.Random, lat0: float, lon0: float) -> tuple[float, float]:
+        r = self.radius_deg
+        return lat0 + rng.uniform(-r, r), lon0 + rng.uniform(-r, r)
+
+
+def generate_reports(
+    n: int,
+    mix: ReportMix | None = None,
+    geo: GeoModel | None = None,
+    citizens: int = 10_000,
+    seed: int = 7,
+):
+    """Yield `n` report bodies."""
+    rng = random.Random(seed)
+    mix = mix or ReportMix()
+    geo = geo or GeoModel()
+    geo.seed(rng)
+    kinds = list(KINDS)
+    weights = mix.weights()
+    for _ in range(n):
+        kind = rng.choices(kinds, weights)[0]
+        lat, lon = geo.sample(rng)
+        citizen_id = f"citizen-{rng.randrange(citizens):06d}"
+        yield {"citizen_id": citizen_id, "lat": lat, "lon": lon, **KINDS[kind]}
+
+
+def telemetry_envelope(report: dict, trace_id: str = "bench-trace") -> dict:
+    """Wrap a report body the way the gateway does before publishing."""
+    return {
+        "event_id": f"{trace_id}-event",
+        "event_type": "telemetry.raw",
+        "schema_version": "v1",
+        "occurred_at": "2026-01-01T00:00:00+00:00",
+        "source": "gateway",
+        "trace_id": trace_id,
+        "payload": {
+            "citizen_id": report["citizen_id"],
+            "lat": report["lat"],
+            "lon": report["lon"],
+            "emergency": report["emergency"],
+            "signals": {
+                "audio_signature": report["audio_signature"],
+                "panic_motion": report["panic_motion"],
+            },
+        },
+    }
+
+
+def arrival_offsets(profile: str, rate: float, duration_s: float, seed: int = 7):
+    """Yield send offsets (seconds from start) for an open-loop load profile.
+
+    - `constant`: evenly spaced at `rate`/s.
+    - `poisson`: exponential inter-arrivals averaging `rate`/s.
+    - `burst`: `rate`/s baseline with 10x spikes for 1 s out of every 10 s.
+    - `ramp`: linear increase from 0 to 2x`rate` over the run.
+    """
+    rng = random.Random(seed)
+    t = 0.0
+    while t < duration_s:
+        if profile == "constant":
+            current = rate
+        elif profile == "poisson":
+            yield t
+            t += rng.expovariate(rate)
+            continue
+        elif profile == "burst":
+            current = rate * 10 if (t % 10.0) < 1.0 else rate
+        elif profile == "ramp":
+            current = max(2 * rate * t / duration_s, rate * 0.01)
+        else:
+            raise ValueError(f"unknown profile {profile!r}; use constant|poisson|burst|ramp")
+        yield t
+        t += 1.0 / current
+
@@ -0,0 +1,130 @@
+"""Micro-benchmarks for the per-event hot spots of the pipeline.
+
+    python -m bench.micro [--n 100000] [--only rules,local,contracts,haversine,json,upsert] [--db sqlite|postgres]
+
+Each benchmark times individual calls with `perf_counter_ns` and prints
+mean / p50 / p99 in microseconds plus calls per second. Benchmarks whose
+service dependencies are not installed are reported as skipped.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from .generators import generate_reports, telemetry_envelope
+from .services import import_from
+from .standins import sqlite_psycopg2
+from .stats import summarize
+
+
+def timed(fn, inputs: list, warmup: int = 1000) -> dict[str, float]:
+    for item in inputs[:warmup]:
+        fn(item)
+    samples = []
+    clock = time.perf_counter_ns
+    for item in inputs:
+        start = clock()
+        fn(item)
+        samples.append((clock() - start) / 1000.0)
+    return summarize(samples)
+
+
+def bench_rules(n: int):
+    rules = import_from("ai-engine", "rules")
+    events = [telemetry_envelope(r) for r in generate_reports(n)]
+    return timed(rules.classify_anomaly, events)
+
+
+def bench_local(n: int, batch: int = 64):
+    local = import_from("ai-engine", "local_evaluator")
+    evaluator = local.LocalEvaluator(batch_size=batch)
+    events = [telemetry_envelope(r) for r in generate_reports(n)]
+    batches = [events[i : i + batch] for i in range(0, len(events), batch)]
+    return timed(evaluator.evaluate_batch, batches, warmup=10)
+
+
+def bench_contracts(n: int):
+    from sentinelmesh import contracts
+    validate = contracts.VALIDATORS["telemetry.raw.v1"]
+    events = [telemetry_envelope(r, trace_id=str(uuid.uuid4())) for r in generate_reports(n)]
+    return timed(validate, events)
+
+
+def bench_haversine(n: int):
+    server = import_from("dispatch-service", "server")
+    points = [(r["lat"], r["lon"], r["lat"] + 0.01, r["lon"] + 0.01) for r in generate_reports(n)]
+    return timed(lambda p: server.haversine_m(*p), points)
+
+
+def bench_json(n: int):
+    # Mirrors the kafka_client serializer/deserializer pair.
+    envelopes = [telemetry_envelope(r, trace_id=str(uuid.uuid4())) for r in generate_reports(n)]
+    return timed(lambda e: json.loads(json.dumps(e).encode("utf-8").decode("utf-8")), envelopes)
+
+
+def bench_upsert(n: int, db: str):
+    if db == "sqlite":
+        sys.modules["psycopg2"] = sqlite_psycopg2()
+    consumer = import_from("core-service", "consumer")
+    if db == "postgres":
+        import_from("core-service", "db").init_db()
+
+    def incident(report):
+        created_at = datetime.now(timezone.utc)
+        return {
+            "id": consumer.new_incident_id(created_at),
+            "trace_id": str(uuid.uuid4()),
+            "category": "manual_emergency",
+            "confidence": 0.7,
+            "lat": report["lat"],
+            "lon": report["lon"],
+            "citizen_id": report["citizen_id"],
+            "created_at": created_at.isoformat(),
+            "officer_id": "officer-001",
+            "eta_seconds": 120,
+            "distance_meters": 1450.0,
+        }
+
+    incidents = [incident(r) for r in generate_reports(n)]
+    return timed(consumer.upsert_incident, incidents, warmup=min(100, n))
+
+
+BENCHMARKS = {
+    "rules": ("rules.classify_anomaly", bench_rules),
+    "local": ("LocalEvaluator.evaluate_batch x64", bench_local),
+    "contracts": ("contracts telemetry.raw.v1", bench_contracts),
+    "haversine": ("server.haversine_m", bench_haversine),
+    "json": ("envelope json encode+decode", bench_json),
+    "upsert": ("consumer.upsert_incident", bench_upsert),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=100_000, help="calls per benchmark")
+    parser.add_argument("--upsert-n", type=int, default=2_000, help="calls for the DB benchmark")
+    parser.add_argument("--only", default=",".join(BENCHMARKS))
+    parser.add_argument("--db", choices=("sqlite", "postgres"), default="sqlite")
+    args = parser.parse_args(argv)
+    # The services share one transport module, read at its first import (contracts or
+    # consumer.py, which builds its clients at import); nothing here needs a broker.
+    os.environ.setdefault("TRANSPORT_BACKEND", "memory")
+
+    print(f"{'benchmark':32} {'mean_us':>10} {'p50_us':>10} {'p99_us':>10} {'calls/s':>12}")
+    for key in filter(None, args.only.split(",")):
+        label, fn = BENCHMARKS[key]
+        try:
+            stats = fn(args.upsert_n, args.db) if key == "upsert" else fn(args.n)
+        except ImportError as exc:
+            print(f"{label:32} skipped (missing dependency: {exc.name})")
+            continue
+        rate = 1e6 / stats["mean"] if stats["mean"] else float("inf")
+        print(f"{label:32} {stats['mean']:10.2f} {stats['p50']:10.2f} {stats['p99']:10.2f} {rate:12.0f}")
+
+
+if __name__ == "__main__":
+    main()
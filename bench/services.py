@@ -0,0 +1,47 @@
+"""Import service packages side by side in one interpreter.
+
+Every service ships its code as a top-level package called `app`, so they
+cannot all be imported normally. `load_service` registers a service's `app`
+directory under a unique alias instead; relative imports inside it keep
+working. `overrides` pre-registers stand-in submodules (e.g. a broker or DB
+shim) before any service module imports them.
+
+The shared `sentinelmesh` package (`shared/`) is put on `sys.path`, as the
+images do by copying it next to `app`, so all services loaded here use the
+same transport, contracts and metrics modules.
+"""
+
+import importlib
+import importlib.util
+import sys
+from pathlib import Path
+
+SERVICES_DIR = Path(__file__).resolve().parents[1] / "services"
+SHARED_DIR = SERVICES_DIR.parent / "shared"
+if str(SHARED_DIR) not in sys.path:
+    sys.path.insert(0, str(SHARED_DIR))
+
+
+def load_service(service: str, alias: str | None = None, overrides: dict | None = None):
+    alias = alias or "bench_" + service.replace("-", "_")
+    if alias in sys.modules:
+        return sys.modules[alias]
+
+    app_dir = SERVICES_DIR / service / "app"
+    spec = importlib.util.spec_from_file_location(
+        alias, app_dir / "__init__.py", submodule_search_locations=[str(app_dir)]
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[alias] = package
+    if (app_dir / "__init__.py").exists():
+        spec.loader.exec_module(package)
+    for name, module in (overrides or {}).items():
+        sys.modules[f"{alias}.{name}"] = module
+        setattr(package, name, module)
+    return package
+
+
+def import_from(service: str, module: str, alias: str | None = None, overrides: dict | None = None):
+    """`import_from("ai-engine", "rules")` ~ `from app import rules` inside ai-engine."""
+    package = load_service(service, alias, overrides)
+    return importlib.import_module(f"{package.__name__}.{module}")
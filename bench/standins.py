@@ -0,0 +1,168 @@
+"""In-process stand-in for Postgres.
+
+`sqlite_psycopg2()` returns a module shaped like `psycopg2` backed by a
+SQLite file, so core-service's SQL still goes through `get_conn()` without a
+database server. (Brokerless runs use the shared `memory`/`log`
+transports.)
+
+The Postgres-only bits core-service relies on are emulated: `pg_notify()` /
+`LISTEN` (delivered on commit to listening connections, which expose
+`fileno()` / `poll()` / `notifies` for `select()`), and `FOR UPDATE SKIP
+LOCKED` is dropped since SQLite already serializes writers.
+"""
+
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import types
+from datetime import date, datetime
+from pathlib import Path
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+  id TEXT NOT NULL,
+  trace_id TEXT NOT NULL,
+  category TEXT NOT NULL,
+  confidence REAL NOT NULL,
+  lat REAL,
+  lon REAL,
+  citizen_id TEXT,
+  created_at TEXT NOT NULL,
+  officer_id TEXT,
+  eta_seconds INTEGER,
+  distance_meters REAL,
+  cluster_id TEXT,
+  leader_incident_id TEXT,
+  PRIMARY KEY (id, created_at)
+);
+CREATE TABLE IF NOT EXISTS outbox (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  topic TEXT NOT NULL,
+  key TEXT,
+  payload TEXT NOT NULL,
+  created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+_LISTEN = re.compile(r"\s*LISTEN\s+(\w+)", re.IGNORECASE)
+_listeners: dict[str, list["_Connection"]] = {}
+_listeners_lock = threading.Lock()
+
+
+def _adapt(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class _Cursor:
+    def __init__(self, cur: sqlite3.Cursor, conn: "_Connection"):
+        self._cur = cur
+        self._conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cur.close()
+        return False
+
+    def execute(self, sql, params=()):
+        listen = _LISTEN.match(sql)
+        if listen:
+            self._conn._listen(listen.group(1))
+            return
+        sql = sql.replace("FOR UPDATE SKIP LOCKED", "").replace("%s", "?")
+        self._cur.execute(sql, tuple(_adapt(p) for p in params))
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+
+class _Connection:
+    """psycopg2 semantics: `with conn` commits/rolls back but does not close."""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.create_function("pg_notify", 2, self._queue_notify)
+        self._pending: list[tuple[str, str]] = []
+        self._pipe = None
+        self.notifies: list[str] = []
+        self.autocommit = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def cursor(self):
+        return _Cursor(self._conn.cursor(), self)
+
+    def commit(self):
+        self._conn.commit()
+        pending, self._pending = self._pending, []
+        for channel, payload in pending:
+            with _listeners_lock:
+                listeners = list(_listeners.get(channel, ()))
+            for listener in listeners:
+                listener.notifies.append(payload)
+                os.write(listener._pipe[1], b"!")
+
+    def rollback(self):
+        self._conn.rollback()
+        self._pending.clear()
+
+    def close(self):
+        with _listeners_lock:
+            for listeners in _listeners.values():
+                if self in listeners:
+                    listeners.remove(self)
+        if self._pipe is not None:
+            os.close(self._pipe[0])
+            os.close(self._pipe[1])
+            self._pipe = None
+        self._conn.close()
+
+    # --- LISTEN/NOTIFY ---------------------------------------------------------
+
+    def _queue_notify(self, channel, payload):
+        self._pending.append((channel, payload))
+
+    def _listen(self, channel: str):
+        if self._pipe is None:
+            self._pipe = os.pipe()
+            os.set_blocking(self._pipe[0], False)
+        with _listeners_lock:
+            _listeners.setdefault(channel, []).append(self)
+
+    def fileno(self):
+        return self._pipe[0]
+
+    def poll(self):
+        try:
+            while os.read(self._pipe[0], 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+
+def sqlite_psycopg2(path: str | None = None) -> types.ModuleType:
+    """A `psycopg2`-shaped module whose `connect()` opens the same SQLite file."""
+    path = path or str(Path(tempfile.mkdtemp(prefix="sentinelmesh-bench-")) / "incidents.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SQLITE_SCHEMA)
+    module = types.ModuleType("psycopg2")
+    module.connect = lambda dsn=None, **kwargs: _Connection(path)
+    module.sqlite_path = path
+    return module
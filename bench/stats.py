@@ -0,0 +1,23 @@
+"""Latency summaries shared by the micro and end-to-end benchmarks."""
+
+import math
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list (`q` in 0..100)."""
+    if not sorted_values:
+        return math.nan
+    rank = max(math.ceil(q / 100.0 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) if ordered else math.nan,
+        "p50": percentile(ordered, 50),
+        "p99": percentile(ordered, 99),
+        "p999": percentile(ordered, 99.9),
+        "max": ordered[-1] if ordered else math.nan,
+    }
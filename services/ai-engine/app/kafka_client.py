@@ -1,22 +0,0 @@
-import json
-from kafka import KafkaConsumer, KafkaProducer
-
-
-def build_producer(bootstrap: str) -> KafkaProducer:
-    return KafkaProducer(
-        bootstrap_servers=bootstrap,
-        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-        acks="all",
-        retries=5,
-    )
-
-
-def build_consumer(bootstrap: str, topic: str, group_id: str) -> KafkaConsumer:
-    return KafkaConsumer(
-        topic,
-        bootstrap_servers=bootstrap,
-        group_id=group_id,
-        enable_auto_commit=True,
-        auto_offset_reset="earliest",
-        value_deserializer=lambda b: json.loads(b.decode("utf-8")),
-    )
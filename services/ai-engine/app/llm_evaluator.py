@@ -11,6 +11,11 @@ Supported providers:
 - `openai`  -> `langchain-openai` (`OPENAI_API_KEY`)
 - `gemini`  -> `langchain-google-genai` (`GOOGLE_API_KEY`)
 - `ollama`  -> `langchain-ollama` (local/runtime-hosted SLM)
+
+LangChain, LangGraph and the provider SDK are imported inside the methods
+that need them, so importing this module is cheap and the expensive part
+happens when the evaluator is constructed (in the background by default,
+see `main.WarmingEvaluator`).
 """
 
 from __future__ import annotations
@@ -20,8 +25,19 @@ import os
 from dataclasses import dataclass
 from typing import Any, TypedDict
 
-from langchain_core.messages import HumanMessage, SystemMessage
-from langgraph.graph import END, START, StateGraph
+
+def normalize_event(event: dict[str, Any]) -> dict[str, Any]:
+    """Compact model input shared by the LLM and local evaluators."""
+    payload = event.get("payload", {}) or {}
+    signals = payload.get("signals", {}) or {}
+    return {
+        "citizen_id": payload.get("citizen_id"),
+        "lat": payload.get("lat"),
+        "lon": payload.get("lon"),
+        "emergency": bool(payload.get("emergency", False)),
+        "audio_signature": signals.get("audio_signature"),
+        "panic_motion": bool(signals.get("panic_motion", False)),
+    }
 
 
 class EvaluationState(TypedDict):
@@ -74,18 +90,11 @@ class LLMEvaluator:
         raise ValueError(f"Unsupported LLM_PROVIDER='{provider}'. Use openai|gemini|ollama.")
 
     def _normalize_event(self, event: dict[str, Any]) -> dict[str, Any]:
-        payload = event.get("payload", {}) or {}
-        signals = payload.get("signals", {}) or {}
-        return {
-            "citizen_id": payload.get("citizen_id"),
-            "lat": payload.get("lat"),
-            "lon": payload.get("lon"),
-            "emergency": bool(payload.get("emergency", False)),
-            "audio_signature": signals.get("audio_signature"),
-            "panic_motion": bool(signals.get("panic_motion", False)),
-        }
+        return normalize_event(event)
 
     def _prompt_node(self, state: EvaluationState) -> EvaluationState:
+        from langchain_core.messages import HumanMessage, SystemMessage
+
         telemetry = self._normalize_event(state["telemetry_event"])
 
         system = SystemMessage(
@@ -137,6 +146,8 @@ class LLMEvaluator:
         return state
 
     def _build_graph(self):
+        from langgraph.graph import END, START, StateGraph
+
         graph = StateGraph(EvaluationState)
         graph.add_node("prompt", self._prompt_node)
         graph.add_node("model", self._model_node)
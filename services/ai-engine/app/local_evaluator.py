@@ -0,0 +1,165 @@
+"""In-process CPU classifier for telemetry (`AI_EVALUATOR_MODE=local`).
+
+Events are turned into a small feature vector from the same normalized view
+the LLM evaluator prompts with (`llm_evaluator.normalize_event`) and scored
+by a model that runs inside the worker, so there is no network hop or prompt
+to build per event:
+
+- built-in: a softmax linear model whose default weights approximate the
+  heuristic rules;
+- `LOCAL_MODEL_PATH=*.json`: the same linear model with your weights
+  (`{"classes": [...], "weights": [[...] per class], "bias": [...]}`);
+- `*.onnx`: any ONNX model taking float32 `[N, len(FEATURES)]` and returning
+  class probabilities `[N, len(classes)]` (sklearn-onnx: disable zipmap);
+  classes come from `LOCAL_MODEL_CLASSES`;
+- `*.joblib` / `*.pkl`: a fitted sklearn estimator with `predict_proba`.
+
+`evaluate_batch` scores a batch with one forward pass per chunk of
+`LOCAL_BATCH_SIZE` events. For models that release the GIL while scoring
+(ONNX Runtime, sklearn's numpy kernels) chunks run on a thread pool sized to
+the CPU count (`LOCAL_INFERENCE_THREADS`); the pure-Python linear model would
+only contend for the GIL there, so its chunks run inline. The main loop feeds
+it the records returned by each consumer poll.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from .llm_evaluator import normalize_event
+
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "")
+LOCAL_MODEL_CLASSES = os.getenv("LOCAL_MODEL_CLASSES", "none,acoustic_gunshot,panic_motion,manual_emergency")
+LOCAL_NONE_CLASS = os.getenv("LOCAL_NONE_CLASS", "none")
+LOCAL_MIN_CONFIDENCE = float(os.getenv("LOCAL_MIN_CONFIDENCE", "0.5"))
+LOCAL_BATCH_SIZE = int(os.getenv("LOCAL_BATCH_SIZE", "64"))
+LOCAL_INFERENCE_THREADS = int(os.getenv("LOCAL_INFERENCE_THREADS", "0"))  # 0 = os.cpu_count()
+
+FEATURES = ("emergency", "panic_motion", "audio_gunshot")
+GUNSHOT_KEYWORDS = ("gun", "shot", "disparo")
+
+# Fitted to the heuristic rules' confidences; rows follow `classes`, columns FEATURES.
+DEFAULT_MODEL = {
+    "classes": ["none", "acoustic_gunshot", "panic_motion", "manual_emergency"],
+    "weights": [
+        [-3.79, -0.22, 0.16],
+        [1.33, -0.20, 3.11],
+        [1.32, 1.47, -1.82],
+        [1.14, -1.06, -1.46],
+    ],
+    "bias": [3.01, -2.04, -1.22, 0.24],
+}
+
+
+def features(event: dict[str, Any]) -> list[float]:
+    telemetry = normalize_event(event)
+    audio = (telemetry["audio_signature"] or "").lower()
+    return [
+        1.0 if telemetry["emergency"] else 0.0,
+        1.0 if telemetry["panic_motion"] else 0.0,
+        1.0 if any(k in audio for k in GUNSHOT_KEYWORDS) else 0.0,
+    ]
+
+
+class LinearModel:
+    """Softmax over `weights . x + bias`, in plain Python (a few dozen flops per event)."""
+
+    releases_gil = False
+
+    def __init__(self, spec: dict):
+        self.classes = list(spec["classes"])
+        self.weights = [list(map(float, row)) for row in spec["weights"]]
+        self.bias = [float(b) for b in spec["bias"]]
+
+    def predict_proba(self, rows: list[list[float]]) -> list[list[float]]:
+        out = []
+        for x in rows:
+            logits = [b + sum(w * v for w, v in zip(row, x)) for row, b in zip(self.weights, self.bias)]
+            top = max(logits)
+            exp = [math.exp(z - top) for z in logits]
+            total = sum(exp)
+            out.append([e / total for e in exp])
+        return out
+
+
+class OnnxModel:
+    releases_gil = True
+
+    def __init__(self, path: str, classes: list[str], threads: int):
+        import numpy as np
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = 1 if threads > 1 else 0  # parallelism comes from the chunk pool
+        self._np = np
+        self._session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self._input = self._session.get_inputs()[0].name
+        self.classes = classes
+
+    def predict_proba(self, rows: list[list[float]]) -> list[list[float]]:
+        outputs = self._session.run(None, {self._input: self._np.asarray(rows, dtype=self._np.float32)})
+        probabilities = next(o for o in outputs if getattr(o, "ndim", 0) == 2)
+        return probabilities.tolist()
+
+
+class SklearnModel:
+    releases_gil = True
+
+    def __init__(self, path: str):
+        import joblib
+
+        self._estimator = joblib.load(path)
+        self.classes = [str(c) for c in self._estimator.classes_]
+
+    def predict_proba(self, rows: list[list[float]]) -> list[list[float]]:
+        return self._estimator.predict_proba(rows).tolist()
+
+
+def load_model(path: str = LOCAL_MODEL_PATH, threads: int = 1):
+    if not path:
+        return LinearModel(DEFAULT_MODEL)
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            return LinearModel(json.load(f))
+    if path.endswith(".onnx"):
+        return OnnxModel(path, [c.strip() for c in LOCAL_MODEL_CLASSES.split(",")], threads)
+    if path.endswith((".joblib", ".pkl")):
+        return SklearnModel(path)
+    raise ValueError(f"Unsupported LOCAL_MODEL_PATH='{path}'. Use .json|.onnx|.joblib|.pkl.")
+
+
+class LocalEvaluator:
+    """Batch classifier; `evaluate(event)` keeps the single-event evaluator interface."""
+
+    def __init__(self, model=None, batch_size: int = LOCAL_BATCH_SIZE, threads: int = LOCAL_INFERENCE_THREADS):
+        threads = threads or os.cpu_count() or 1
+        self.model = model or load_model(threads=threads)
+        self.batch_size = batch_size
+        self._pool = None
+        if threads > 1 and getattr(self.model, "releases_gil", False):
+            self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="local-eval")
+
+    def _decide(self, probabilities: list[float]) -> tuple[str, float] | None:
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        category, confidence = self.model.classes[best], probabilities[best]
+        if category == LOCAL_NONE_CLASS or confidence < LOCAL_MIN_CONFIDENCE:
+            return None
+        return category, round(confidence, 4)
+
+    def _run(self, rows: list[list[float]]) -> list[tuple[str, float] | None]:
+        return [self._decide(p) for p in self.model.predict_proba(rows)]
+
+    def evaluate_batch(self, events: list[dict[str, Any]]) -> list[tuple[str, float] | None]:
+        rows = [features(event) for event in events]
+        if len(rows) <= self.batch_size:
+            return self._run(rows)  # one forward pass; skip the pool hand-off
+        chunks = [rows[i : i + self.batch_size] for i in range(0, len(rows), self.batch_size)]
+        scored = self._pool.map(self._run, chunks) if self._pool else map(self._run, chunks)
+        return [decision for chunk in scored for decision in chunk]
+
+    def evaluate(self, event: dict[str, Any]) -> tuple[str, float] | None:
+        return self._run([features(event)])[0]
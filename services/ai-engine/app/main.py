@@ -8,30 +8,127 @@ Didactic objective:
 The evaluator strategy is runtime-configurable:
 - heuristic: deterministic Python rules (default).
 - langgraph: LLM/SLM-based classifier through LangChain + LangGraph.
+- local: in-process CPU classifier scored in batches (`app/local_evaluator.py`).
+
+Telemetry is consumed in batches of up to `AI_BATCH_MAX_EVENTS` (whatever a
+poll returns; an idle poll waits at most `AI_BATCH_WAIT_MS`). Each batch is
+checked against `telemetry.raw.v1` (invalid events go to the topic's `.dlq`),
+batch-capable evaluators score it at once, and anomalies are flushed once per
+batch. The consumer auto-commits on the next poll, so each batch blocks until
+every anomaly and dead-lettered event is acked (`transport.deliver`, which
+retries with backoff) — at-least-once, as in core-service.
+
+Startup is kept short so new replicas take traffic quickly: nothing connects
+at import time, the producer is only built when the first anomaly is
+published, and in langgraph mode the heuristic rules serve events while the
+LLM graph is built in a background thread (`AI_EVALUATOR_WARMUP=background`).
+A per-phase startup report is printed and exported as
+`ai_engine_startup_seconds`; `STARTUP_IMPORT_PROFILE=1` adds import times.
 """
 
+from .startup import profile  # first, so the import profiler sees everything below
+
 import os
+import threading
+import time
 import uuid
 from datetime import datetime, timezone
 
-from .kafka_client import build_consumer, build_producer
+from sentinelmesh import contracts, metrics
+from sentinelmesh.transport import build_consumer, build_producer, deliver, iter_batches
+
 from .rules import classify_anomaly
 
 KAFKA_BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP", "redpanda:9092")
 TOPIC_TELEMETRY = os.getenv("TOPIC_TELEMETRY", "telemetry.raw.v1")
 TOPIC_ANOMALY = os.getenv("TOPIC_ANOMALY", "anomaly.high_confidence.v1")
 AI_EVALUATOR_MODE = os.getenv("AI_EVALUATOR_MODE", "heuristic").lower()
-
-consumer = build_consumer(KAFKA_BOOTSTRAP, TOPIC_TELEMETRY, group_id="ai-engine-v1")
-producer = build_producer(KAFKA_BOOTSTRAP)
+AI_EVALUATOR_WARMUP = os.getenv("AI_EVALUATOR_WARMUP", "background").lower()  # background|blocking
+AI_BATCH_MAX_EVENTS = int(os.getenv("AI_BATCH_MAX_EVENTS", "256"))
+AI_BATCH_WAIT_MS = int(os.getenv("AI_BATCH_WAIT_MS", "100"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+QUEUE_TIME = metrics.Histogram(
+    "event_queue_seconds", "Time between an event's occurred_at and its consumption.", ("topic",)
+)
+EVALUATOR_LATENCY = metrics.Histogram(
+    "ai_engine_evaluator_seconds", "Evaluator latency per event.", ("mode",)
+)
+BATCH_SIZE = metrics.Histogram(
+    "ai_engine_batch_events",
+    "Telemetry events per consumed batch.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+DECISIONS = metrics.Counter("ai_engine_decisions_total", "Evaluated telemetry events.", ("outcome",))
+STARTUP = metrics.Gauge("ai_engine_startup_seconds", "Duration of each startup phase.", ("phase",))
+
+_producer = None
+_producer_lock = threading.Lock()
+
+
+def get_producer():
+    """Build the producer on first use; workers that never escalate never connect."""
+    global _producer
+    if _producer is None:
+        with _producer_lock:
+            if _producer is None:
+                _producer = build_producer(KAFKA_BOOTSTRAP)
+    return _producer
+
+
+class WarmingEvaluator:
+    """Serves the heuristic rules until the LangGraph evaluator is ready.
+
+    The LLM evaluator is imported and compiled in a daemon thread; once built
+    it replaces the heuristic atomically. If it cannot be built, the worker
+    keeps running on the heuristic.
+    """
+
+    def __init__(self):
+        self.active = ("heuristic", classify_anomaly)  # (mode, callable), swapped as one value
+        self.ready = threading.Event()
+        threading.Thread(target=self._warm, name="llm-warmup", daemon=True).start()
+
+    def _warm(self):
+        started = time.perf_counter()
+        try:
+            from .llm_evaluator import LLMEvaluator
+
+            self.active = ("langgraph", LLMEvaluator().evaluate)
+        except Exception as exc:  # fallback keeps the service operational for class demos
+            print(f"[ai-engine] evaluator=langgraph unavailable ({exc}), staying on heuristic")
+            return
+        finally:
+            self.ready.set()
+        elapsed = time.perf_counter() - started
+        STARTUP.labels(phase="llm_warmup").set(elapsed)
+        print(f"[ai-engine] evaluator=langgraph ready after {elapsed * 1000:.0f}ms")
+
+    def __call__(self, event):
+        return self.active[1](event)
 
 
 def build_evaluator():
     """Return a callable(event)->tuple[str,float]|None depending on mode."""
+    if AI_EVALUATOR_MODE == "local":
+        try:
+            from .local_evaluator import LocalEvaluator
+
+            evaluator = LocalEvaluator()
+            print(f"[ai-engine] evaluator=local model={type(evaluator.model).__name__}")
+            return evaluator
+        except Exception as exc:  # e.g. missing onnxruntime or an unreadable model file
+            print(f"[ai-engine] evaluator=local unavailable ({exc}), falling back to heuristic")
+            return classify_anomaly
+
     if AI_EVALUATOR_MODE != "langgraph":
         print("[ai-engine] evaluator=heuristic")
         return classify_anomaly
 
+    if AI_EVALUATOR_WARMUP == "background":
+        print("[ai-engine] evaluator=heuristic while langgraph warms up")
+        return WarmingEvaluator()
+
     try:
         from .llm_evaluator import LLMEvaluator
 
@@ -43,42 +140,104 @@ def build_evaluator():
         return classify_anomaly
 
 
+def iter_decisions(evaluator, events: list[dict]):
+    """Yield `(event, decision, seconds)` as soon as each decision is known.
+
+    Only evaluators with `evaluate_batch` score the batch in one call (the
+    cost is then split evenly); per-event evaluators — the heuristic or a
+    remote LLM — are called one event at a time, so an anomaly is published
+    without waiting for the rest of the batch to be evaluated.
+    """
+    batch = getattr(evaluator, "evaluate_batch", None)
+    if batch is not None:
+        started = time.perf_counter()
+        decisions = batch(events)
+        per_event = (time.perf_counter() - started) / len(events)
+        for event, decision in zip(events, decisions):
+            yield event, decision, per_event
+        return
+    for event in events:
+        started = time.perf_counter()
+        decision = evaluator(event)
+        yield event, decision, time.perf_counter() - started
+
+
+def evaluator_mode(evaluator) -> str:
+    if isinstance(evaluator, WarmingEvaluator):
+        return evaluator.active[0]
+    return "heuristic" if evaluator is classify_anomaly else AI_EVALUATOR_MODE
+
+
 def main():
-    evaluator = build_evaluator()
+    profile.checkpoint("imports")
+    with profile.phase("evaluator"):
+        evaluator = build_evaluator()
+    with profile.phase("metrics"):
+        metrics.start_http_server(METRICS_PORT)
+    with profile.phase("consumer"):
+        consumer = build_consumer(KAFKA_BOOTSTRAP, TOPIC_TELEMETRY, group_id="ai-engine-v1")
+    for phase, seconds in profile.phases:
+        STARTUP.labels(phase=phase).set(seconds)
+    print(profile.report())
+    queue_time = QUEUE_TIME.labels(topic=TOPIC_TELEMETRY)
     print(f"[ai-engine] consuming {TOPIC_TELEMETRY} -> producing {TOPIC_ANOMALY}")
 
-    for msg in consumer:
-        event = msg.value
-        trace_id = event.get("trace_id", str(uuid.uuid4()))
-        p = event.get("payload", {})
-        citizen_id = p.get("citizen_id", "unknown")
-
-        decision = evaluator(event)
-        if not decision:
-            print(f"[ai-engine] trace={trace_id} citizen={citizen_id} -> no anomaly")
+    for batch in iter_batches(consumer, AI_BATCH_MAX_EVENTS, AI_BATCH_WAIT_MS):
+        BATCH_SIZE.observe(len(batch))
+        valid, invalid = contracts.split_valid("telemetry.raw.v1", batch)
+        if invalid:
+            contracts.dead_letter(get_producer(), TOPIC_TELEMETRY, invalid, "ai-engine")
+        events = [msg.value for msg in valid]
+        if not events:
             continue
-
-        category, confidence = decision
-        anomaly = {
-            "event_id": str(uuid.uuid4()),
-            "event_type": "anomaly.high_confidence",
-            "schema_version": "v1",
-            "occurred_at": datetime.now(timezone.utc).isoformat(),
-            "source": "ai-engine",
-            "trace_id": trace_id,
-            "payload": {
-                "category": category,
-                "confidence": confidence,
-                "lat": p.get("lat"),
-                "lon": p.get("lon"),
-                "citizen_id": citizen_id,
-                "evidence_refs": [],
-            },
-        }
-
-        producer.send(TOPIC_ANOMALY, key=citizen_id, value=anomaly)
-        producer.flush(timeout=5)
-        print(f"[ai-engine] trace={trace_id} -> published anomaly ({category}, {confidence})")
+        for event in events:
+            waited = metrics.seconds_since(event.get("occurred_at"))
+            if waited is not None:
+                queue_time.observe(waited)
+
+        evaluator_latency = EVALUATOR_LATENCY.labels(mode=evaluator_mode(evaluator))
+        messages, futures = [], []
+
+        # Each anomaly is handed to the producer as soon as it is decided; the
+        # batch ends with a single flush that resends anything not acked.
+        for event, decision, seconds in iter_decisions(evaluator, events):
+            evaluator_latency.observe(seconds)
+            DECISIONS.labels(outcome="anomaly" if decision else "no_anomaly").inc()
+            trace_id = event["trace_id"]
+            p = event["payload"]
+            citizen_id = p["citizen_id"]
+            if not decision:
+                print(f"[ai-engine] trace={trace_id} citizen={citizen_id} -> no anomaly")
+                continue
+
+            category, confidence = decision
+            anomaly = {
+                "event_id": str(uuid.uuid4()),
+                "event_type": "anomaly.high_confidence",
+                "schema_version": "v1",
+                "occurred_at": datetime.now(timezone.utc).isoformat(),
+                "source": "ai-engine",
+                "trace_id": trace_id,
+                "payload": {
+                    "category": category,
+                    "confidence": confidence,
+                    "lat": p["lat"],
+                    "lon": p["lon"],
+                    "citizen_id": citizen_id,
+                    "reported_at": event["occurred_at"],
+                    "evidence_refs": [],
+                },
+            }
+
+            messages.append((TOPIC_ANOMALY, citizen_id, anomaly))
+            try:
+                futures.append(get_producer().send(TOPIC_ANOMALY, key=citizen_id, value=anomaly))
+            except Exception as exc:  # resent by deliver below
+                futures.append(exc)
+            print(f"[ai-engine] trace={trace_id} -> published anomaly ({category}, {confidence})")
+
+        if messages:
+            deliver(get_producer(), messages, sent=futures)
 
 
 if __name__ == "__main__":
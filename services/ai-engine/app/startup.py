@@ -0,0 +1,106 @@
+"""Startup-time breakdown for the ai-engine worker.
+
+`profile.phase(name)` times a named startup phase. With
+`STARTUP_IMPORT_PROFILE=1`, every module imported after this one is also
+timed (self and cumulative time, like `python -X importtime`) through a
+wrapping meta-path finder, and the slowest imports are printed in the
+report. The finder is diagnostic only and off by default.
+"""
+
+import importlib.abc
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+STARTUP_IMPORT_PROFILE = os.getenv("STARTUP_IMPORT_PROFILE", "0") == "1"
+STARTUP_IMPORT_TOP = int(os.getenv("STARTUP_IMPORT_TOP", "15"))
+
+
+class _TimedLoader:
+    def __init__(self, loader, name: str, profile: "StartupProfile"):
+        self._loader = loader
+        self._name = name
+        self._profile = profile
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        stack = self._profile._import_stack
+        stack.append(0.0)  # time spent in nested imports
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            cumulative = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += cumulative
+            self._profile.imports.append((self._name, cumulative - nested, cumulative))
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    def __init__(self, profile: "StartupProfile"):
+        self._profile = profile
+
+    def find_spec(self, name, path, target=None):
+        if threading.current_thread() is not threading.main_thread():
+            return None  # keep the stack single-threaded
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader, name, self._profile)
+            return spec
+        return None
+
+
+class StartupProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+        self.imports: list[tuple[str, float, float]] = []  # (module, self_s, cumulative_s)
+        self._import_stack: list[float] = []
+        self._finder = None
+        if STARTUP_IMPORT_PROFILE:
+            self._finder = _TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def checkpoint(self, name: str):
+        """Record the time since the previous phase (or since start) as `name`."""
+        elapsed = time.perf_counter() - self.started - sum(seconds for _, seconds in self.phases)
+        self.phases.append((name, elapsed))
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def report(self, service: str = "ai-engine") -> str:
+        if self._finder is not None:
+            sys.meta_path.remove(self._finder)
+            self._finder = None
+        total = time.perf_counter() - self.started
+        parts = " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases)
+        lines = [f"[{service}] startup ready in {total * 1000:.1f}ms: {parts}"]
+        if self.imports:
+            lines.append(f"[{service}] import time (self us | cumulative us | module):")
+            for name, own, cumulative in sorted(self.imports, key=lambda i: i[2], reverse=True)[
+                :STARTUP_IMPORT_TOP
+            ]:
+                lines.append(f"[{service}]   {own * 1e6:10.0f} | {cumulative * 1e6:10.0f} | {name}")
+        return "\n".join(lines)
+
+
+profile = StartupProfile()
@@ -0,0 +1,195 @@
+"""Sliding-window hot-spot aggregation over the anomaly stream.
+
+Anomalies are bucketed into square grid cells of `CLUSTER_CELL_DEG` degrees.
+Each active cell owns a slot in preallocated `array` columns, with one
+counter per time bucket in a ring of `CLUSTER_WINDOW_S / CLUSTER_BUCKET_S`
+buckets. When the ring advances, the expiring bucket is subtracted from the
+window totals. An observation within the current bucket is O(1); the first
+one in a new bucket also pays one pass over the active cells per expired
+bucket (at most a full ring). The highest confidence is kept per bucket, so
+a summary scans its cell's ring and never reports an expired anomaly.
+
+A cell whose window count reaches `CLUSTER_MIN_EVENTS` becomes a cluster and
+an `incident.cluster.v1` summary is emitted; further summaries follow each
+time the count doubles. The first incident dispatched in a cell is the
+cluster's leader. With per-cluster dispatch enabled, once the cell is a
+cluster later anomalies are absorbed into the leader instead of being
+dispatched again — unless their scheduler priority is higher than the
+leader's, in which case they are dispatched and take over as leader.
+"""
+
+import math
+import os
+import uuid
+from array import array
+from dataclasses import dataclass
+
+CLUSTER_CELL_DEG = float(os.getenv("CLUSTER_CELL_DEG", "0.005"))  # ~550 m of latitude
+CLUSTER_WINDOW_S = float(os.getenv("CLUSTER_WINDOW_S", "300"))
+CLUSTER_BUCKET_S = float(os.getenv("CLUSTER_BUCKET_S", "10"))
+CLUSTER_MAX_CELLS = int(os.getenv("CLUSTER_MAX_CELLS", "4096"))
+CLUSTER_MIN_EVENTS = int(os.getenv("CLUSTER_MIN_EVENTS", "3"))
+CLUSTER_DISPATCH = os.getenv("CLUSTER_DISPATCH", "false").lower() == "true"
+
+
+@dataclass
+class Observation:
+    cluster_id: str
+    incident_id: str  # the cell's leader incident
+    absorbed: bool  # True if this anomaly rides on an earlier leader's dispatch
+    emit: bool  # True if a cluster summary should be published now
+
+
+class HotspotAggregator:
+    def __init__(
+        self,
+        cell_deg: float = CLUSTER_CELL_DEG,
+        window_s: float = CLUSTER_WINDOW_S,
+        bucket_s: float = CLUSTER_BUCKET_S,
+        max_cells: int = CLUSTER_MAX_CELLS,
+        min_events: int = CLUSTER_MIN_EVENTS,
+    ):
+        self.cell_deg = cell_deg
+        self.window_s = window_s
+        self.bucket_s = bucket_s
+        self.min_events = min_events
+        self.buckets = max(1, math.ceil(window_s / bucket_s))
+        cells, nb = max_cells, self.buckets
+
+        # Per (slot, bucket) counters, laid out slot-major.
+        self._counts = array("l", [0]) * (cells * nb)
+        self._lat = array("d", [0.0]) * (cells * nb)
+        self._lon = array("d", [0.0]) * (cells * nb)
+        self._max_conf = array("d", [0.0]) * (cells * nb)
+        self._category: list[str | None] = [None] * (cells * nb)  # of the bucket's max
+        # Per-slot window totals.
+        self._total = array("l", [0]) * cells
+        self._lat_total = array("d", [0.0]) * cells
+        self._lon_total = array("d", [0.0]) * cells
+        self._emitted_at = array("l", [0]) * cells  # window count at last summary
+        self._leader_at = array("d", [0.0]) * cells
+        self._leader_priority = array("d", [0.0]) * cells
+        self._leader: list[str | None] = [None] * cells
+        self._cluster_id: list[str | None] = [None] * cells
+
+        self._slots: dict[tuple[int, int], int] = {}
+        self._cells: list[tuple[int, int] | None] = [None] * cells
+        self._free = list(range(cells - 1, -1, -1))
+        self._head = None  # absolute index of the newest bucket
+
+    def _advance(self, now: float):
+        head = int(now // self.bucket_s)
+        if self._head is None:
+            self._head = head
+            return
+        if head <= self._head:
+            return
+        nb = self.buckets
+        # Expire every bucket that falls out of the window (at most a full ring).
+        for b in range(max(self._head + 1, head - nb + 1), head + 1):
+            col = b % nb
+            for cell, slot in list(self._slots.items()):
+                i = slot * nb + col
+                if self._counts[i]:
+                    self._total[slot] -= self._counts[i]
+                    self._lat_total[slot] -= self._lat[i]
+                    self._lon_total[slot] -= self._lon[i]
+                    self._counts[i], self._lat[i], self._lon[i] = 0, 0.0, 0.0
+                if self._total[slot] <= 0:
+                    self._release(cell, slot)
+        self._head = head
+
+    def _release(self, cell: tuple[int, int], slot: int):
+        del self._slots[cell]
+        self._cells[slot] = None
+        nb = self.buckets
+        for i in range(slot * nb, slot * nb + nb):
+            self._counts[i], self._lat[i], self._lon[i] = 0, 0.0, 0.0
+        self._total[slot] = 0
+        self._lat_total[slot] = self._lon_total[slot] = 0.0
+        self._leader_priority[slot] = 0.0
+        self._emitted_at[slot] = 0
+        self._leader[slot] = self._cluster_id[slot] = None
+        self._free.append(slot)
+
+    def cell_of(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def observe(
+        self,
+        lat: float,
+        lon: float,
+        category: str,
+        confidence: float,
+        incident_id: str,
+        now: float,
+        priority: float = 0.0,
+    ) -> Observation | None:
+        """Count one anomaly with scheduler base `priority`.
+
+        It is absorbed only if the cell is already a cluster (window count at
+        least `min_events`) and has a live leader of at least equal priority.
+        Otherwise it is to be dispatched, and `incident_id` becomes the leader
+        when the cell has none, the leader expired or it outranks the leader.
+        Returns None when every slot is in use (the anomaly is handled alone).
+        """
+        self._advance(now)
+        cell = self.cell_of(lat, lon)
+        slot = self._slots.get(cell)
+        if slot is None:
+            if not self._free:
+                return None
+            slot = self._free.pop()
+            self._slots[cell] = slot
+            self._cells[slot] = cell
+            self._cluster_id[slot] = str(uuid.uuid4())
+
+        i = slot * self.buckets + self._head % self.buckets
+        self._counts[i] += 1
+        self._lat[i] += lat
+        self._lon[i] += lon
+        self._total[slot] += 1
+        self._lat_total[slot] += lat
+        self._lon_total[slot] += lon
+        if self._counts[i] == 1 or confidence >= self._max_conf[i]:  # first in bucket: overwrite stale max
+            self._max_conf[i] = confidence
+            self._category[i] = category
+
+        count = self._total[slot]
+        leader = self._leader[slot]
+        live = leader is not None and now - self._leader_at[slot] < self.window_s
+        outranks = priority > self._leader_priority[slot]
+        absorbed = live and count >= self.min_events and not outranks
+        if not live or outranks:
+            self._leader[slot], self._leader_at[slot] = incident_id, now
+            self._leader_priority[slot] = priority
+            leader = incident_id
+
+        emit = count >= self.min_events and count >= 2 * self._emitted_at[slot]
+        if emit:
+            self._emitted_at[slot] = count
+        return Observation(self._cluster_id[slot], leader, absorbed, emit)
+
+    def summary(self, lat: float, lon: float) -> dict:
+        """Payload of `incident.cluster.v1` for the cell containing (lat, lon)."""
+        cell = self.cell_of(lat, lon)
+        slot = self._slots[cell]
+        count = self._total[slot]
+        nb = self.buckets
+        max_conf, category = 0.0, None
+        for b in range(self._head - nb + 1, self._head + 1):  # oldest first: ties go to the newest
+            i = slot * nb + b % nb
+            if self._counts[i] and self._max_conf[i] >= max_conf:
+                max_conf, category = self._max_conf[i], self._category[i]
+        return {
+            "cluster_id": self._cluster_id[slot],
+            "cell": f"{cell[0]}:{cell[1]}",
+            "cell_deg": self.cell_deg,
+            "lat": self._lat_total[slot] / count,
+            "lon": self._lon_total[slot] / count,
+            "count": count,
+            "window_seconds": self.window_s,
+            "category": category,
+            "max_confidence": max_conf,
+            "incident_id": self._leader[slot],
+        }
@@ -1,28 +1,73 @@
+import json
 import os
+import threading
+import time
 import uuid
 from datetime import datetime, timezone
 
-from .db import get_conn
-from .grpc_client import get_dispatch_stub, request_route
-from .kafka_client import build_consumer, build_producer
+from sentinelmesh import contracts, metrics
+from sentinelmesh.transport import build_consumer, build_producer, commit_offsets
+
+from .clusters import CLUSTER_DISPATCH, HotspotAggregator
+from .db import enqueue_outbox, get_conn, new_incident_id
+from .grpc_client import DispatchClient
+from .outbox import relay_loop
+from .scheduler import SCHEDULER_WORKERS, OffsetTracker, PriorityScheduler
+from .stream import hub
 
 KAFKA_BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP", "redpanda:9092")
 TOPIC_ANOMALY = os.getenv("TOPIC_ANOMALY", "anomaly.high_confidence.v1")
 TOPIC_DISPATCH = os.getenv("TOPIC_DISPATCH", "dispatch.route_assigned.v1")
+TOPIC_CLUSTER = os.getenv("TOPIC_CLUSTER", "incident.cluster.v1")
+BATCH_MAX_EVENTS = int(os.getenv("CORE_BATCH_MAX_EVENTS", "256"))
+BATCH_WAIT_MS = int(os.getenv("CORE_BATCH_WAIT_MS", "100"))
+COMMIT_INTERVAL_S = float(os.getenv("CORE_COMMIT_INTERVAL_S", "1.0"))
+JOB_MAX_ATTEMPTS = int(os.getenv("CORE_JOB_MAX_ATTEMPTS", "20"))
+JOB_RETRY_BASE_S = float(os.getenv("CORE_JOB_RETRY_BASE_S", "0.5"))
+JOB_RETRY_MAX_S = float(os.getenv("CORE_JOB_RETRY_MAX_S", "30"))
+
+QUEUE_TIME = metrics.Histogram(
+    "event_queue_seconds", "Time between an event's occurred_at and its consumption.", ("topic",)
+)
+GRPC_LATENCY = metrics.Histogram("core_dispatch_grpc_seconds", "GetInterceptRoute call latency.")
+DB_UPSERT_LATENCY = metrics.Histogram(
+    "core_db_upsert_seconds", "Incident upsert (and outbox insert) transaction latency."
+)
+REPORT_TO_DISPATCH = metrics.Histogram(
+    "pipeline_report_to_dispatch_seconds",
+    "Time from the citizen report (gateway occurred_at) to the dispatch event being committed to the outbox.",
+)
+SCHEDULER_DEPTH = metrics.Gauge("core_scheduler_queue_depth", "Anomalies waiting for a dispatch worker.")
+SCHEDULER_WAIT = metrics.Histogram(
+    "core_scheduler_wait_seconds", "Time an anomaly waited in the priority scheduler.", ("category",)
+)
+ANOMALY_OUTCOMES = metrics.Counter(
+    "core_anomalies_total", "Consumed anomalies: dispatched or absorbed into a cluster.", ("outcome",)
+)
+JOB_RETRIES = metrics.Counter(
+    "core_job_retries_total",
+    "Dispatch/persist attempts that failed and were retried or dead-lettered.",
+    ("outcome",),
+)
+ABSORBED_LATENCY = metrics.Histogram(
+    "core_db_absorbed_seconds", "Insert latency of an incident absorbed into a cluster leader."
+)
 
-consumer = build_consumer(KAFKA_BOOTSTRAP, TOPIC_ANOMALY, group_id="core-service-v1")
+# Offsets are committed by `run` once the scheduled jobs have finished.
+consumer = build_consumer(KAFKA_BOOTSTRAP, TOPIC_ANOMALY, group_id="core-service-v1", auto_commit=False)
 producer = build_producer(KAFKA_BOOTSTRAP)
 
 
-def upsert_incident(incident: dict):
+def upsert_incident(incident: dict, events: list[tuple[str, str, dict]] = ()):
+    """Upsert `incident` and queue `events` as `(topic, key, envelope)` in one transaction."""
     with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
               INSERT INTO incidents (id, trace_id, category, confidence, lat, lon, citizen_id, created_at,
-                                     officer_id, eta_seconds, distance_meters)
-              VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-              ON CONFLICT (id) DO UPDATE SET
+                                     officer_id, eta_seconds, distance_meters, cluster_id, leader_incident_id)
+              VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+              ON CONFLICT (id, created_at) DO UPDATE SET
                 officer_id=EXCLUDED.officer_id,
                 eta_seconds=EXCLUDED.eta_seconds,
                 distance_meters=EXCLUDED.distance_meters
@@ -39,69 +84,249 @@ def upsert_incident(incident: dict):
                     incident.get("officer_id"),
                     incident.get("eta_seconds"),
                     incident.get("distance_meters"),
+                    incident.get("cluster_id"),
+                    incident.get("leader_incident_id"),
                 ),
             )
+            for topic, key, event in events:
+                enqueue_outbox(cur, topic, key, json.dumps(event))
         conn.commit()
 
 
-def run():
-    stub = get_dispatch_stub()
-    print(f"[core-service] consuming {TOPIC_ANOMALY} -> writing Postgres + calling gRPC dispatch")
+def publish_cluster(summary: dict, trace_id: str):
+    cluster_event = {
+        "event_id": str(uuid.uuid4()),
+        "event_type": "incident.cluster",
+        "schema_version": "v1",
+        "occurred_at": datetime.now(timezone.utc).isoformat(),
+        "source": "core-service",
+        "trace_id": trace_id,
+        "payload": summary,
+    }
+    producer.send(TOPIC_CLUSTER, key=summary["cluster_id"], value=cluster_event)
+    hub.publish("cluster", summary)
+
+
+def schedule_anomaly(record, aggregator: HotspotAggregator, scheduler: PriorityScheduler, token):
+    """Consumer-thread half: aggregate into clusters, enqueue by priority.
+
+    `record.value` has already been validated against `anomaly.high_confidence.v1`.
+    Its offset (`token`, from `OffsetTracker.start`) stays uncommitted until a
+    worker finishes the job.
+    """
+    ev = record.value
+    trace_id = ev["trace_id"]
+    p = ev["payload"]
+
+    created_at = datetime.now(timezone.utc)
+    incident_id = new_incident_id(created_at)
+    lat = float(p["lat"])
+    lon = float(p["lon"])
+    category = p["category"]
+    confidence = float(p["confidence"])
+    priority = scheduler.priority(category, confidence)
+
+    obs = aggregator.observe(lat, lon, category, confidence, incident_id, time.time(), priority)
+    if obs is not None and obs.emit:
+        publish_cluster(aggregator.summary(lat, lon), trace_id)
+    absorbed = CLUSTER_DISPATCH and obs is not None and obs.absorbed
+    ANOMALY_OUTCOMES.labels(outcome="absorbed" if absorbed else "dispatched").inc()
+
+    job = {
+        "trace_id": trace_id,
+        "incident_id": incident_id,
+        "created_at": created_at,
+        "lat": lat,
+        "lon": lon,
+        "category": category,
+        "confidence": confidence,
+        "citizen_id": p["citizen_id"],
+        "reported_at": p.get("reported_at") or ev["occurred_at"],
+        "cluster_id": obs.cluster_id if obs is not None else None,
+        # Absorbed anomalies skip routing but are still persisted by a worker.
+        "leader_incident_id": obs.incident_id if absorbed else None,
+        "record": record,
+        "token": token,
+    }
+    scheduler.put(job, category, confidence)
 
-    for msg in consumer:
-        ev = msg.value
-        trace_id = ev.get("trace_id", str(uuid.uuid4()))
-        p = ev.get("payload", {}) or {}
 
-        incident_id = str(uuid.uuid4())
-        lat = float(p.get("lat") or 0.0)
-        lon = float(p.get("lon") or 0.0)
+def _job_incident(job: dict) -> dict:
+    return {
+        "id": job["incident_id"],
+        "trace_id": job["trace_id"],
+        "category": job["category"],
+        "confidence": job["confidence"],
+        "lat": job["lat"],
+        "lon": job["lon"],
+        "citizen_id": job["citizen_id"],
+        "created_at": job["created_at"].isoformat(),
+        "cluster_id": job.get("cluster_id"),
+        "leader_incident_id": job.get("leader_incident_id"),
+    }
 
-        officer_id = "officer-001"
-        officer_lat, officer_lon = lat + 0.01, lon + 0.01
 
-        resp = request_route(
-            stub,
+def record_absorbed(job: dict):
+    """Worker half for an anomaly absorbed into a cluster: persist it, linked to the leader."""
+    incident = _job_incident(job)
+    with ABSORBED_LATENCY.time():
+        upsert_incident(incident)
+    hub.publish("incident", incident)
+    print(
+        f"[core-service] trace={job['trace_id']} incident={incident['id']} absorbed into "
+        f"cluster={incident['cluster_id']} -> {incident['leader_incident_id']}"
+    )
+
+
+def dispatch_incident(job: dict, client: DispatchClient, priority: float = 0.0):
+    """Worker half: route via gRPC, persist, publish the assignment."""
+    trace_id, incident_id = job["trace_id"], job["incident_id"]
+    lat, lon = job["lat"], job["lon"]
+
+    officer_id = "officer-001"
+    officer_lat, officer_lon = lat + 0.01, lon + 0.01
+
+    with GRPC_LATENCY.time():
+        resp = client.request_route(
             incident_id=incident_id,
             incident_lat=lat,
             incident_lon=lon,
             officer_id=officer_id,
             officer_lat=officer_lat,
             officer_lon=officer_lon,
+            priority=priority,
         )
 
-        incident = {
-            "id": incident_id,
-            "trace_id": trace_id,
-            "category": p.get("category", "unknown"),
-            "confidence": float(p.get("confidence") or 0.0),
-            "lat": lat,
-            "lon": lon,
-            "citizen_id": p.get("citizen_id"),
-            "created_at": datetime.now(timezone.utc).isoformat(),
+    incident = {
+        **_job_incident(job),
+        "officer_id": resp.officer_id,
+        "eta_seconds": int(resp.eta_seconds),
+        "distance_meters": float(resp.distance_meters),
+    }
+
+    dispatch_event = {
+        "event_id": str(uuid.uuid4()),
+        "event_type": "dispatch.route_assigned",
+        "schema_version": "v1",
+        "occurred_at": datetime.now(timezone.utc).isoformat(),
+        "source": "core-service",
+        "trace_id": trace_id,
+        "payload": {
+            "incident_id": incident_id,
             "officer_id": resp.officer_id,
             "eta_seconds": int(resp.eta_seconds),
             "distance_meters": float(resp.distance_meters),
-        }
+        },
+    }
 
-        upsert_incident(incident)
+    # The outbox relay publishes the event once this transaction commits.
+    with DB_UPSERT_LATENCY.time():
+        upsert_incident(incident, [(TOPIC_DISPATCH, incident_id, dispatch_event)])
+    hub.publish("incident", incident)
 
-        dispatch_event = {
-            "event_id": str(uuid.uuid4()),
-            "event_type": "dispatch.route_assigned",
-            "schema_version": "v1",
-            "occurred_at": datetime.now(timezone.utc).isoformat(),
-            "source": "core-service",
+    total = metrics.seconds_since(job["reported_at"])
+    if total is not None:
+        REPORT_TO_DISPATCH.observe(total)
+    hub.publish(
+        "route_assigned",
+        {
+            **dispatch_event["payload"],
             "trace_id": trace_id,
-            "payload": {
-                "incident_id": incident_id,
-                "officer_id": resp.officer_id,
-                "eta_seconds": int(resp.eta_seconds),
-                "distance_meters": float(resp.distance_meters),
-            },
-        }
-
-        producer.send(TOPIC_DISPATCH, key=incident_id, value=dispatch_event)
-        producer.flush(timeout=5)
-
-        print(f"[core-service] trace={trace_id} incident={incident_id} saved + dispatch assigned")
+            "category": incident["category"],
+            "lat": lat,
+            "lon": lon,
+        },
+    )
+
+    print(f"[core-service] trace={trace_id} incident={incident_id} saved + dispatch assigned")
+
+
+def run_job(job: dict, client: DispatchClient, priority: float):
+    """Handle one job, retrying with exponential backoff (e.g. while Postgres is down).
+
+    After `CORE_JOB_MAX_ATTEMPTS` failures the anomaly goes to the dead-letter
+    topic rather than blocking a worker forever; `dead_letter` itself retries
+    (with a bounded flush) until the broker acks, so it is never dropped.
+    """
+    attempt = 0
+    while True:
+        try:
+            if job["leader_incident_id"]:
+                record_absorbed(job)
+            else:
+                dispatch_incident(job, client, priority)
+            return
+        except Exception as exc:  # one failed incident must not take the worker down
+            attempt += 1
+            if attempt >= JOB_MAX_ATTEMPTS:
+                JOB_RETRIES.labels(outcome="dead_lettered").inc()
+                contracts.dead_letter(
+                    producer, TOPIC_ANOMALY, [(job["record"], f"{type(exc).__name__}: {exc}")], "core-service"
+                )
+                return
+            JOB_RETRIES.labels(outcome="retried").inc()
+            delay = min(JOB_RETRY_MAX_S, JOB_RETRY_BASE_S * 2 ** (attempt - 1))
+            print(f"[core-service] trace={job['trace_id']} attempt {attempt} failed: {exc}; retry in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def dispatch_worker(scheduler: PriorityScheduler, client: DispatchClient, tracker: OffsetTracker):
+    while True:
+        job, waited, priority = scheduler.get()
+        SCHEDULER_WAIT.labels(category=job["category"]).observe(waited)
+        try:
+            run_job(job, client, priority)
+        except Exception as exc:  # unexpected (run_job retries its own failures): keep the job
+            print(f"[core-service] trace={job['trace_id']} failed unexpectedly ({exc}); re-enqueued")
+            time.sleep(JOB_RETRY_BASE_S)
+            scheduler.put(job, job["category"], job["confidence"])
+            continue
+        tracker.done(job["token"])
+
+
+def run():
+    client = DispatchClient()
+    aggregator = HotspotAggregator()
+    scheduler = PriorityScheduler()
+    tracker = OffsetTracker()
+    SCHEDULER_DEPTH.set_function(lambda: len(scheduler))
+    threading.Thread(target=relay_loop, args=(producer,), daemon=True).start()
+    for _ in range(SCHEDULER_WORKERS):
+        threading.Thread(target=dispatch_worker, args=(scheduler, client, tracker), daemon=True).start()
+    print(
+        f"[core-service] consuming {TOPIC_ANOMALY} -> writing Postgres + calling gRPC dispatch "
+        f"({SCHEDULER_WORKERS} workers)"
+    )
+
+    queue_time = QUEUE_TIME.labels(topic=TOPIC_ANOMALY)
+
+    committed: dict = {}
+    last_commit = time.monotonic()
+
+    while True:
+        polled = consumer.poll(timeout_ms=BATCH_WAIT_MS, max_records=BATCH_MAX_EVENTS)
+        batch = [record for records in polled.values() for record in records]
+        # Track every record in offset order before splitting: `committable`
+        # relies on each partition's pending offsets being ascending.
+        tokens = {id(record): tracker.start(record) for record in batch}
+        valid, invalid = contracts.split_valid("anomaly.high_confidence.v1", batch)
+        if invalid:
+            contracts.dead_letter(producer, TOPIC_ANOMALY, invalid, "core-service")  # retries until acked
+            for record, _ in invalid:
+                tracker.done(tokens[id(record)])
+        for msg in valid:
+            waited = metrics.seconds_since(msg.value["occurred_at"])
+            if waited is not None:
+                queue_time.observe(waited)
+            schedule_anomaly(msg, aggregator, scheduler, tokens[id(msg)])
+
+        # Commit from this thread (consumers are not thread-safe), also while idle.
+        if time.monotonic() - last_commit >= COMMIT_INTERVAL_S:
+            last_commit = time.monotonic()
+            positions = tracker.committable()
+            if positions != committed:
+                try:
+                    commit_offsets(consumer, positions)
+                    committed = positions
+                except Exception as exc:  # e.g. rebalance: retried on the next interval
+                    print(f"[core-service] offset commit failed: {exc}")
@@ -1,7 +1,25 @@
 import os
+import select
+import time
+import uuid
+from datetime import date, datetime, time as dtime, timedelta, timezone
 
 import psycopg2
 
+# Partitioning / retention knobs for the time-partitioned `incidents` table.
+PARTITION_DAYS_AHEAD = int(os.getenv("INCIDENTS_PARTITION_DAYS_AHEAD", "7"))
+RETENTION_DAYS = int(os.getenv("INCIDENTS_RETENTION_DAYS", "0"))  # 0 = keep forever
+RETENTION_MODE = os.getenv("INCIDENTS_RETENTION_MODE", "detach").lower()  # detach|drop
+MAINTENANCE_INTERVAL_S = float(os.getenv("INCIDENTS_MAINTENANCE_INTERVAL_S", "3600"))
+MIGRATION_BATCH_ROWS = int(os.getenv("INCIDENTS_MIGRATION_BATCH_ROWS", "10000"))
+MIGRATION_LOCK_TIMEOUT_MS = int(os.getenv("INCIDENTS_MIGRATION_LOCK_TIMEOUT_MS", "5000"))
+
+PARTITION_PREFIX = "incidents_p"
+LEGACY_TABLE = "incidents_legacy"
+LEGACY_EXPIRED_TABLE = "incidents_legacy_expired"
+INIT_LOCK_KEY = 0x53454E54  # serializes schema and partition DDL across replicas
+OUTBOX_CHANNEL = "outbox"
+
 
 def dsn() -> str:
     host = os.getenv("POSTGRES_HOST", "postgres")
@@ -16,24 +34,330 @@ def get_conn():
     return psycopg2.connect(dsn())
 
 
-def init_db():
+def new_incident_id(created_at: datetime) -> str:
+    """Time-ordered UUID (v7 layout) whose first 48 bits are `created_at` in ms.
+
+    Embedding the creation time in the id lets lookups by id be restricted to
+    the single partition that holds the row.
+    """
+    ms = int(created_at.timestamp() * 1000) & ((1 << 48) - 1)
+    value = (ms << 80) | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return str(uuid.UUID(int=value))
+
+
+def incident_created_at(incident_id: str) -> datetime | None:
+    """Inverse of `new_incident_id`; `None` for legacy (non-v7) ids."""
+    try:
+        parsed = uuid.UUID(incident_id)
+    except ValueError:
+        return None
+    if parsed.version != 7:
+        return None
+    return datetime.fromtimestamp((parsed.int >> 80) / 1000, tz=timezone.utc)
+
+
+def _partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def _partition_day(name: str) -> date | None:
+    try:
+        return datetime.strptime(name[len(PARTITION_PREFIX) :], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def _create_partitioned_table(cur):
+    # The partition key must be part of the primary key on a partitioned table.
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS incidents (
+      id TEXT NOT NULL,
+      trace_id TEXT NOT NULL,
+      category TEXT NOT NULL,
+      confidence DOUBLE PRECISION NOT NULL,
+      lat DOUBLE PRECISION,
+      lon DOUBLE PRECISION,
+      citizen_id TEXT,
+      created_at TIMESTAMPTZ NOT NULL,
+      officer_id TEXT,
+      eta_seconds INT,
+      distance_meters DOUBLE PRECISION,
+      cluster_id TEXT,
+      leader_incident_id TEXT,
+      PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    """
+    )
+    # Hot-spot links (absorbed anomalies point at their cluster's leader) for
+    # tables created before they existed; nullable, so a catalog-only change.
+    cur.execute("ALTER TABLE incidents ADD COLUMN IF NOT EXISTS cluster_id TEXT;")
+    cur.execute("ALTER TABLE incidents ADD COLUMN IF NOT EXISTS leader_incident_id TEXT;")
+    cur.execute("CREATE INDEX IF NOT EXISTS incidents_created_at_idx ON incidents (created_at);")
+
+
+def _create_outbox_table(cur):
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS outbox (
+      id BIGSERIAL PRIMARY KEY,
+      topic TEXT NOT NULL,
+      key TEXT,
+      payload TEXT NOT NULL,
+      created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    """
+    )
+
+
+def enqueue_outbox(cur, topic: str, key: str | None, payload: str):
+    """Queue an event in the caller's transaction and wake the relay on commit."""
+    cur.execute("INSERT INTO outbox (topic, key, payload) VALUES (%s, %s, %s);", (topic, key, payload))
+    cur.execute("SELECT pg_notify(%s, '');", (OUTBOX_CHANNEL,))
+
+
+def claim_outbox(cur, limit: int) -> list[tuple[int, str, str | None, str]]:
+    """Remove up to `limit` of the oldest events, skipping rows another relay holds.
+
+    The rows stay locked until the caller's transaction ends: commit once the
+    events are published, roll back to hand them to the next attempt.
+    """
+    cur.execute(
+        """
+    DELETE FROM outbox WHERE id IN (
+      SELECT id FROM outbox ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, topic, key, payload;
+    """,
+        (limit,),
+    )
+    return sorted(cur.fetchall())
+
+
+def listen_outbox(conn) -> bool:
+    """LISTEN for outbox commits on `conn`; False if the driver has no notifications."""
+    if not hasattr(conn, "notifies"):
+        return False
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"LISTEN {OUTBOX_CHANNEL};")
+    return True
+
+
+def wait_outbox(conn, timeout: float):
+    """Block until a NOTIFY arrives on a listening `conn` (or sleep if None), at most `timeout`."""
+    if conn is None:
+        time.sleep(timeout)
+        return
+    if select.select([conn], [], [], timeout)[0]:
+        conn.poll()
+        conn.notifies.clear()
+
+
+def ensure_partitions(cur, start: date, end: date):
+    """Create one daily partition for every day in [start, end].
+
+    Callers hold `INIT_LOCK_KEY`: concurrent `CREATE TABLE IF NOT EXISTS …
+    PARTITION OF` for the same day fails with a pg_type unique violation.
+    """
+    day = start
+    while day <= end:
+        lower = datetime.combine(day, dtime.min, tzinfo=timezone.utc)
+        upper = lower + timedelta(days=1)
+        cur.execute(
+            f"""
+        CREATE TABLE IF NOT EXISTS {_partition_name(day)} PARTITION OF incidents
+        FOR VALUES FROM (%s) TO (%s);
+        """,
+            (lower, upper),
+        )
+        day += timedelta(days=1)
+
+
+def apply_retention(cur, today: date) -> list[str]:
+    """Detach or drop partitions whose whole day is older than RETENTION_DAYS."""
+    if RETENTION_DAYS <= 0:
+        return []
+
+    cutoff = today - timedelta(days=RETENTION_DAYS)
+    cur.execute(
+        """
+    SELECT c.relname
+    FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'incidents'::regclass
+    """
+    )
+    expired = []
+    for (name,) in cur.fetchall():
+        day = _partition_day(name)
+        if day is None or day >= cutoff:
+            continue
+        if RETENTION_MODE == "drop":
+            cur.execute(f"DROP TABLE {name};")
+        else:
+            cur.execute(f"ALTER TABLE incidents DETACH PARTITION {name};")
+        expired.append(name)
+    return expired
+
+
+def _migrate_legacy_incidents(cur):
+    """Swap a pre-partitioning heap `incidents` table for the partitioned one.
+
+    Only the cut-over runs here: the legacy table is renamed to `LEGACY_TABLE`
+    and an empty partitioned table created in its place, which is catalog work
+    and takes the exclusive lock for milliseconds. The rows are moved later, in
+    small transactions, by `backfill_legacy_incidents`.
+    """
+    cur.execute(
+        """
+    SELECT c.relkind FROM pg_class c
+    WHERE c.oid = to_regclass('incidents')
+    """
+    )
+    row = cur.fetchone()
+    if not row or row[0] != "r":
+        return False
+
+    # Fail fast (and let the orchestrator retry) rather than queue every read
+    # behind the rename while a long query holds the legacy table.
+    cur.execute(f"SET LOCAL lock_timeout = {MIGRATION_LOCK_TIMEOUT_MS};")
+    cur.execute(f"ALTER TABLE incidents RENAME TO {LEGACY_TABLE};")
+    cur.execute(f"ALTER INDEX IF EXISTS incidents_pkey RENAME TO {LEGACY_TABLE}_pkey;")
+    _create_partitioned_table(cur)
+    return True
+
+
+def legacy_table_exists(cur) -> bool:
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (LEGACY_TABLE,))
+    return cur.fetchone()[0]
+
+
+def _retention_cutoff(today: date) -> datetime:
+    """Rows created before this belong to partitions retention would remove."""
+    if RETENTION_DAYS <= 0:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    return datetime.combine(today - timedelta(days=RETENTION_DAYS), dtime.min, tzinfo=timezone.utc)
+
+
+def _move_legacy_batch(cur, after: str, cutoff: datetime) -> str | None:
+    """Move the next `MIGRATION_BATCH_ROWS` ids after `after`; returns the last id seen.
+
+    Rows older than `cutoff` are left in the legacy table. Walking the primary
+    key keeps every batch an index range scan, and deleting what was copied
+    makes an interrupted backfill resume where it stopped.
+    """
+    cur.execute(
+        f"SELECT id FROM {LEGACY_TABLE} WHERE id > %s ORDER BY id LIMIT %s;", (after, MIGRATION_BATCH_ROWS)
+    )
+    ids = [r[0] for r in cur.fetchall()]
+    if not ids:
+        return None
+    cur.execute(
+        f"""
+    WITH moved AS (
+      DELETE FROM {LEGACY_TABLE} WHERE id = ANY(%s) AND created_at >= %s
+      RETURNING id, trace_id, category, confidence, lat, lon, citizen_id, created_at,
+                officer_id, eta_seconds, distance_meters
+    )
+    INSERT INTO incidents (id, trace_id, category, confidence, lat, lon, citizen_id, created_at,
+                           officer_id, eta_seconds, distance_meters)
+    SELECT * FROM moved
+    """,
+        (ids, cutoff),
+    )
+    return ids[-1]
+
+
+def backfill_legacy_incidents() -> int:
+    """Copy `LEGACY_TABLE` into the partitioned table, one batch per transaction.
+
+    Safe to run concurrently from several replicas and to interrupt. Once only
+    rows past retention remain, the legacy table is dropped, or renamed to
+    `LEGACY_EXPIRED_TABLE` when `INCIDENTS_RETENTION_MODE=detach`.
+    """
+    today = datetime.now(timezone.utc).date()
+    cutoff = _retention_cutoff(today)
     with get_conn() as conn:
         with conn.cursor() as cur:
+            if not legacy_table_exists(cur):
+                return 0
             cur.execute(
-                """
-            CREATE TABLE IF NOT EXISTS incidents (
-              id TEXT PRIMARY KEY,
-              trace_id TEXT NOT NULL,
-              category TEXT NOT NULL,
-              confidence DOUBLE PRECISION NOT NULL,
-              lat DOUBLE PRECISION,
-              lon DOUBLE PRECISION,
-              citizen_id TEXT,
-              created_at TIMESTAMPTZ NOT NULL,
-              officer_id TEXT,
-              eta_seconds INT,
-              distance_meters DOUBLE PRECISION
-            );
-            """
+                f"SELECT min(created_at), max(created_at) FROM {LEGACY_TABLE} WHERE created_at >= %s;",
+                (cutoff,),
             )
+            oldest, newest = cur.fetchone()
+            if oldest is not None:
+                cur.execute("SELECT pg_advisory_xact_lock(%s);", (INIT_LOCK_KEY,))
+                ensure_partitions(
+                    cur, oldest.astimezone(timezone.utc).date(), newest.astimezone(timezone.utc).date()
+                )
+        conn.commit()
+
+        batches, after = 0, ""
+        while after is not None:
+            with conn.cursor() as cur:
+                after = _move_legacy_batch(cur, after, cutoff)
+            conn.commit()
+            batches += 1
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (INIT_LOCK_KEY,))
+            if not legacy_table_exists(cur):  # another replica finished first
+                conn.rollback()
+                return batches
+            cur.execute(f"SELECT EXISTS (SELECT 1 FROM {LEGACY_TABLE});")
+            if cur.fetchone()[0] and RETENTION_MODE != "drop":
+                cur.execute(f"ALTER TABLE {LEGACY_TABLE} RENAME TO {LEGACY_EXPIRED_TABLE};")
+                cur.execute(
+                    f"ALTER INDEX IF EXISTS {LEGACY_TABLE}_pkey RENAME TO {LEGACY_EXPIRED_TABLE}_pkey;"
+                )
+            else:
+                cur.execute(f"DROP TABLE {LEGACY_TABLE};")
+        conn.commit()
+    return batches
+
+
+def _maintain_partitions(cur) -> list[str]:
+    today = datetime.now(timezone.utc).date()
+    ensure_partitions(cur, today, today + timedelta(days=PARTITION_DAYS_AHEAD))
+    return apply_retention(cur, today)
+
+
+def maintain_partitions():
+    """Create upcoming partitions and enforce retention. Safe to run repeatedly."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (INIT_LOCK_KEY,))
+            expired = _maintain_partitions(cur)
+        conn.commit()
+    return expired
+
+
+def partition_maintenance_loop():
+    try:
+        if backfill_legacy_incidents():
+            print("[core-service] legacy incidents moved into the partitioned table")
+    except Exception as exc:  # rerun on next start; rows not yet moved stay in the legacy table
+        print(f"[core-service] legacy incidents backfill failed: {exc}")
+    while True:
+        time.sleep(MAINTENANCE_INTERVAL_S)
+        try:
+            expired = maintain_partitions()
+            if expired:
+                print(f"[core-service] retention {RETENTION_MODE}: {', '.join(expired)}")
+        except Exception as exc:  # keep the loop alive across transient DB errors
+            print(f"[core-service] partition maintenance failed: {exc}")
+
+
+def init_db():
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (INIT_LOCK_KEY,))
+            if _migrate_legacy_incidents(cur):
+                print(f"[core-service] incidents is now range-partitioned; backfilling from {LEGACY_TABLE}")
+            _create_partitioned_table(cur)
+            _create_outbox_table(cur)
+            _maintain_partitions(cur)
         conn.commit()
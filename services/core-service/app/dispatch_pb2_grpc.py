@@ -3,7 +3,7 @@
 import grpc
 import warnings
 
-import dispatch_pb2 as dispatch__pb2
+from . import dispatch_pb2 as dispatch__pb2
 
 GRPC_GENERATED_VERSION = '1.66.1'
 GRPC_VERSION = grpc.__version__
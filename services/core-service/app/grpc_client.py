@@ -1,31 +1,192 @@
+"""Client side of the dispatch gRPC call.
+
+`DispatchClient` owns long-lived channels to dispatch-service:
+
+- `DISPATCH_GRPC_TARGET` is either one target, resolved through DNS with the
+  `round_robin` policy (every A record of a scaled service gets traffic), or
+  a comma-separated static list, one channel per entry used in rotation.
+- Channels send keepalive pings so idle connections survive NATs/proxies.
+- A service config retries `GetInterceptRoute` on UNAVAILABLE; with
+  `DISPATCH_GRPC_HEDGING_DELAY_MS > 0` it hedges instead (a second attempt is
+  sent if the first has not answered after the delay).
+- The per-call deadline shrinks as incident priority grows: urgent incidents
+  give up on a slow dispatch-service sooner.
+- A circuit breaker opens after `DISPATCH_BREAKER_FAILURES` consecutive
+  failures. While open, and for any failed call, the route is computed
+  locally (straight-line haversine ETA) so incidents are still dispatched.
+"""
+
+import itertools
+import json
+import math
 import os
+import threading
+import time
 
 import grpc
+from sentinelmesh import metrics
 
 from . import dispatch_pb2, dispatch_pb2_grpc  # type: ignore
 
+DISPATCH_GRPC_TARGET = os.getenv("DISPATCH_GRPC_TARGET", "dispatch-service:50051")
+DISPATCH_GRPC_DEADLINE_S = float(os.getenv("DISPATCH_GRPC_DEADLINE_S", "2.0"))
+DISPATCH_GRPC_MIN_DEADLINE_S = float(os.getenv("DISPATCH_GRPC_MIN_DEADLINE_S", "0.25"))
+DISPATCH_GRPC_MAX_ATTEMPTS = int(os.getenv("DISPATCH_GRPC_MAX_ATTEMPTS", "3"))
+DISPATCH_GRPC_HEDGING_DELAY_MS = int(os.getenv("DISPATCH_GRPC_HEDGING_DELAY_MS", "0"))  # 0 = retry, no hedging
+DISPATCH_GRPC_KEEPALIVE_MS = int(os.getenv("DISPATCH_GRPC_KEEPALIVE_MS", "30000"))
+DISPATCH_GRPC_KEEPALIVE_TIMEOUT_MS = int(os.getenv("DISPATCH_GRPC_KEEPALIVE_TIMEOUT_MS", "10000"))
+DISPATCH_BREAKER_FAILURES = int(os.getenv("DISPATCH_BREAKER_FAILURES", "5"))
+DISPATCH_BREAKER_RESET_S = float(os.getenv("DISPATCH_BREAKER_RESET_S", "10"))
+DISPATCH_FALLBACK_SPEED_MPS = float(os.getenv("DISPATCH_FALLBACK_SPEED_MPS", "12.0"))
+
+SERVICE_NAME = "sentinelmesh.dispatch.DispatchService"
+
+FALLBACKS = metrics.Counter(
+    "core_dispatch_fallback_total", "Routes computed locally instead of by dispatch-service.", ("reason",)
+)
+BREAKER_OPEN = metrics.Gauge("core_dispatch_breaker_open", "1 while the dispatch circuit breaker is open.")
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    r = 6371000.0
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dl / 2) ** 2
+    return 2 * r * math.asin(math.sqrt(a))
+
+
+def service_config() -> str:
+    name = [{"service": SERVICE_NAME, "method": "GetInterceptRoute"}]
+    if DISPATCH_GRPC_HEDGING_DELAY_MS > 0:
+        policy = {
+            "hedgingPolicy": {
+                "maxAttempts": DISPATCH_GRPC_MAX_ATTEMPTS,
+                "hedgingDelay": f"{DISPATCH_GRPC_HEDGING_DELAY_MS / 1000}s",
+                "nonFatalStatusCodes": ["UNAVAILABLE"],
+            }
+        }
+    else:
+        policy = {
+            "retryPolicy": {
+                "maxAttempts": DISPATCH_GRPC_MAX_ATTEMPTS,
+                "initialBackoff": "0.05s",
+                "maxBackoff": "0.5s",
+                "backoffMultiplier": 2,
+                "retryableStatusCodes": ["UNAVAILABLE"],
+            }
+        }
+    return json.dumps(
+        {"loadBalancingConfig": [{"round_robin": {}}], "methodConfig": [{"name": name, **policy}]}
+    )
+
+
+def channel_options() -> list[tuple[str, object]]:
+    return [
+        ("grpc.enable_retries", 1),
+        ("grpc.service_config", service_config()),
+        ("grpc.keepalive_time_ms", DISPATCH_GRPC_KEEPALIVE_MS),
+        ("grpc.keepalive_timeout_ms", DISPATCH_GRPC_KEEPALIVE_TIMEOUT_MS),
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.http2.max_pings_without_data", 0),
+    ]
+
+
+def priority_deadline(priority: float) -> float:
+    """Seconds allowed for one call: the full deadline at priority 0, shorter above it."""
+    return max(DISPATCH_GRPC_MIN_DEADLINE_S, DISPATCH_GRPC_DEADLINE_S / (1.0 + max(priority, 0.0)))
+
+
+class CircuitBreaker:
+    """Closed -> open after `failures` consecutive errors; one probe call after `reset_s`."""
+
+    def __init__(self, failures: int = DISPATCH_BREAKER_FAILURES, reset_s: float = DISPATCH_BREAKER_RESET_S):
+        self.failures = failures
+        self.reset_s = reset_s
+        self._consecutive = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_s:
+                return False
+            self._probing = True  # half-open: let exactly one call through
+            return True
+
+    def record(self, ok: bool):
+        with self._lock:
+            self._probing = False
+            if ok:
+                self._consecutive = 0
+                self._opened_at = None
+                return
+            self._consecutive += 1
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+
+
+class DispatchClient:
+    def __init__(self, target: str = DISPATCH_GRPC_TARGET, breaker: CircuitBreaker | None = None):
+        targets = [t.strip() for t in target.split(",") if t.strip()]
+        options = channel_options()
+        self._channels = [grpc.insecure_channel(t, options=options) for t in targets]
+        self._stubs = itertools.cycle([dispatch_pb2_grpc.DispatchServiceStub(c) for c in self._channels])
+        self.breaker = breaker or CircuitBreaker()
+        BREAKER_OPEN.set_function(lambda: 1 if self.breaker.is_open else 0)
+
+    def close(self):
+        for channel in self._channels:
+            channel.close()
+
+    def request_route(
+        self,
+        incident_id: str,
+        incident_lat: float,
+        incident_lon: float,
+        officer_id: str,
+        officer_lat: float,
+        officer_lon: float,
+        priority: float = 0.0,
+    ):
+        req = dispatch_pb2.InterceptRequest(
+            incident_id=incident_id,
+            incident_lat=incident_lat,
+            incident_lon=incident_lon,
+            officer_id=officer_id,
+            officer_lat=officer_lat,
+            officer_lon=officer_lon,
+        )
+        if not self.breaker.allow():
+            FALLBACKS.labels(reason="breaker_open").inc()
+            return local_route(req)
+        try:
+            resp = next(self._stubs).GetInterceptRoute(req, timeout=priority_deadline(priority))
+        except grpc.RpcError as exc:
+            self.breaker.record(False)
+            FALLBACKS.labels(reason=exc.code().name.lower()).inc()
+            print(f"[core-service] incident={incident_id} dispatch gRPC failed ({exc.code().name}), local route")
+            return local_route(req)
+        self.breaker.record(True)
+        return resp
+
 
-def get_dispatch_stub():
-    target = os.getenv("DISPATCH_GRPC_TARGET", "dispatch-service:50051")
-    channel = grpc.insecure_channel(target)
-    return dispatch_pb2_grpc.DispatchServiceStub(channel)
-
-
-def request_route(
-    stub,
-    incident_id: str,
-    incident_lat: float,
-    incident_lon: float,
-    officer_id: str,
-    officer_lat: float,
-    officer_lon: float,
-):
-    req = dispatch_pb2.InterceptRequest(
-        incident_id=incident_id,
-        incident_lat=incident_lat,
-        incident_lon=incident_lon,
-        officer_id=officer_id,
-        officer_lat=officer_lat,
-        officer_lon=officer_lon,
+def local_route(req):
+    """Straight-line route with the same ETA model as dispatch-service."""
+    dist = haversine_m(req.incident_lat, req.incident_lon, req.officer_lat, req.officer_lon)
+    return dispatch_pb2.InterceptResponse(
+        incident_id=req.incident_id,
+        officer_id=req.officer_id,
+        distance_meters=float(dist),
+        eta_seconds=int(dist / DISPATCH_FALLBACK_SPEED_MPS),
+        route_polyline=(
+            f"LOCAL({req.officer_lat},{req.officer_lon})->({req.incident_lat},{req.incident_lon})"
+        ),
     )
-    return stub.GetInterceptRoute(req, timeout=2.0)
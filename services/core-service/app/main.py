@@ -1,19 +1,37 @@
+import asyncio
 import threading
+from datetime import timedelta
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sentinelmesh import metrics
 
 from .consumer import run as consumer_run
-from .db import get_conn, init_db
+from .db import (
+    LEGACY_TABLE,
+    get_conn,
+    incident_created_at,
+    init_db,
+    legacy_table_exists,
+    partition_maintenance_loop,
+)
 from .models import IncidentOut
+from .stream import Subscription, hub
 
 app = FastAPI(title="SentinelMesh Core Service", version="0.1.0")
 
 
+@app.on_event("startup")
+async def bind_stream_hub():
+    hub.bind_loop(asyncio.get_running_loop())
+
+
 @app.on_event("startup")
 def startup():
     init_db()
     t = threading.Thread(target=consumer_run, daemon=True)
     t.start()
+    threading.Thread(target=partition_maintenance_loop, daemon=True).start()
 
 
 @app.get("/health")
@@ -21,18 +39,60 @@ def health():
     return {"ok": True, "service": "core-service"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/v1/incidents/stream")
+async def stream_incidents(
+    bbox: str | None = Query(None, description="min_lat,min_lon,max_lat,max_lon"),
+    category: list[str] | None = Query(None),
+):
+    """Server-Sent Events feed of new incidents and route assignments."""
+    box = None
+    if bbox:
+        try:
+            box = tuple(float(v) for v in bbox.split(","))
+        except ValueError:
+            box = ()
+        if len(box) != 4:
+            raise HTTPException(status_code=400, detail="invalid_bbox")
+
+    if not hub.has_capacity():
+        raise HTTPException(status_code=503, detail="too_many_subscribers")
+
+    return StreamingResponse(
+        hub.frames(Subscription(bbox=box, categories=frozenset(category or ()))),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/v1/incidents/{incident_id}", response_model=IncidentOut)
 def get_incident(incident_id: str):
+    columns = (
+        "id, trace_id, category, confidence, lat, lon, citizen_id, officer_id, eta_seconds, distance_meters"
+    )
+    query = f"SELECT {columns}, cluster_id, leader_incident_id FROM incidents WHERE id=%s"
+    params: tuple = (incident_id,)
+
+    # Time-ordered ids carry their creation time: bound created_at so the
+    # planner prunes every partition except the one holding the row.
+    created_at = incident_created_at(incident_id)
+    if created_at is not None:
+        query += " AND created_at >= %s AND created_at < %s"
+        params += (created_at - timedelta(seconds=1), created_at + timedelta(seconds=1))
+
     with get_conn() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-              SELECT id, trace_id, category, confidence, lat, lon, citizen_id, officer_id, eta_seconds, distance_meters
-              FROM incidents WHERE id=%s
-            """,
-                (incident_id,),
-            )
+            cur.execute(query, params)
             row = cur.fetchone()
+            # Pre-partitioning ids are not time-ordered; until the backfill has
+            # moved them, they may still live in the legacy table.
+            if not row and created_at is None and legacy_table_exists(cur):
+                cur.execute(f"SELECT {columns}, NULL, NULL FROM {LEGACY_TABLE} WHERE id=%s", (incident_id,))
+                row = cur.fetchone()
 
     if not row:
         raise HTTPException(status_code=404, detail="incident_not_found")
@@ -48,4 +108,6 @@ def get_incident(incident_id: str):
         officer_id=row[7],
         eta_seconds=row[8],
         distance_meters=row[9],
+        cluster_id=row[10],
+        leader_incident_id=row[11],
     )
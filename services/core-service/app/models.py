@@ -12,3 +12,5 @@ class IncidentOut(BaseModel):
     officer_id: str | None
     eta_seconds: int | None
     distance_meters: float | None
+    cluster_id: str | None = None
+    leader_incident_id: str | None = None  # set when absorbed into that incident's dispatch
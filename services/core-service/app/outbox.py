@@ -0,0 +1,86 @@
+"""Relay from the `outbox` table to the broker.
+
+Dispatch events are written to `outbox` in the same transaction as their
+incident (`consumer.upsert_incident`), so an incident is never stored without
+its event or vice versa. This relay claims the oldest rows in batches of
+`OUTBOX_BATCH_SIZE`, sends them, flushes the producer once per batch and
+deletes them by committing. A failed send rolls the batch back and it is
+retried, so delivery is at-least-once.
+
+The relay sleeps on `LISTEN outbox` (woken by the `pg_notify` issued with
+every insert) and also re-checks every `OUTBOX_POLL_INTERVAL_S`; with a driver
+that has no notifications it just polls. Several core-service replicas can
+relay concurrently: claimed rows are locked with `SKIP LOCKED`.
+"""
+
+import json
+import os
+import time
+
+from sentinelmesh import metrics
+
+from .db import claim_outbox, get_conn, listen_outbox, wait_outbox
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+OUTBOX_POLL_INTERVAL_S = float(os.getenv("OUTBOX_POLL_INTERVAL_S", "1.0"))
+OUTBOX_FLUSH_TIMEOUT_S = float(os.getenv("OUTBOX_FLUSH_TIMEOUT_S", "10"))
+
+RELAY_BATCH = metrics.Histogram(
+    "core_outbox_batch_events",
+    "Events published per outbox relay batch.",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+RELAY_DELAY = metrics.Histogram(
+    "core_outbox_delay_seconds", "Time from an event's occurred_at to the relay publishing it."
+)
+
+
+def relay_batch(conn, producer) -> int:
+    """Publish one batch of outbox events; returns how many were relayed."""
+    with conn:  # commit deletes the rows; any error rolls the claim back
+        with conn.cursor() as cur:
+            rows = claim_outbox(cur, OUTBOX_BATCH_SIZE)
+            if not rows:
+                return 0
+            values = [json.loads(payload) for _, _, _, payload in rows]
+            futures = [
+                producer.send(topic, key=key, value=value)
+                for (_, topic, key, _), value in zip(rows, values)
+            ]
+            producer.flush(timeout=OUTBOX_FLUSH_TIMEOUT_S)
+            for future in futures:
+                future.get(timeout=0)  # raise if the broker rejected any of them
+    RELAY_BATCH.observe(len(rows))
+    for value in values:
+        delay = metrics.seconds_since(value.get("occurred_at"))
+        if delay is not None:
+            RELAY_DELAY.observe(delay)
+    return len(rows)
+
+
+def _connect():
+    conn, listener = get_conn(), get_conn()
+    if not listen_outbox(listener):
+        listener.close()
+        listener = None
+    return conn, listener
+
+
+def relay_loop(producer):
+    conn = listener = None
+    while True:
+        try:
+            if conn is None:
+                conn, listener = _connect()
+            if relay_batch(conn, producer) < OUTBOX_BATCH_SIZE:
+                wait_outbox(listener, OUTBOX_POLL_INTERVAL_S)
+        except Exception as exc:  # broker/DB hiccup: the claimed rows stay in the outbox
+            print(f"[core-service] outbox relay failed: {exc}")
+            for c in (conn, listener):
+                try:
+                    if c is not None:
+                        c.close()
+                except Exception:
+                    pass
+            conn = listener = None
+            time.sleep(OUTBOX_POLL_INTERVAL_S)
@@ -0,0 +1,118 @@
+"""Bounded priority queue between anomaly consumption and dispatch.
+
+Priority is `category weight x confidence x 2^(wait / SCHEDULER_AGING_S)`:
+a job's priority doubles for every `SCHEDULER_AGING_S` seconds it waits, so
+low-priority work cannot starve. Because every queued job ages at the same
+rate, the ordering is fixed at enqueue time —
+`log2(weight x confidence) - enqueued_at / aging_s` — and a plain heap
+suffices. When the queue is full, `put` blocks, which pushes back on the
+consumer instead of dropping incidents.
+
+Because jobs finish out of order, the consumer commits offsets itself:
+`OffsetTracker` knows, per partition, the oldest consumed record whose job
+has not finished, and nothing from there on is committed. A crash then
+replays every queued or in-flight anomaly instead of losing it.
+"""
+
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from collections import deque
+
+SCHEDULER_CAPACITY = int(os.getenv("SCHEDULER_CAPACITY", "1000"))
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+SCHEDULER_AGING_S = float(os.getenv("SCHEDULER_AGING_S", "5"))
+SCHEDULER_CATEGORY_WEIGHTS = os.getenv(
+    "SCHEDULER_CATEGORY_WEIGHTS", "acoustic_gunshot=3,panic_motion=2,manual_emergency=1"
+)
+
+
+def parse_weights(spec: str) -> dict[str, float]:
+    weights = {}
+    for part in filter(None, spec.split(",")):
+        name, _, value = part.partition("=")
+        weights[name.strip()] = float(value)
+    return weights
+
+
+class PriorityScheduler:
+    def __init__(
+        self,
+        capacity: int = SCHEDULER_CAPACITY,
+        aging_s: float = SCHEDULER_AGING_S,
+        weights: dict[str, float] | None = None,
+    ):
+        self.capacity = capacity
+        self.aging_s = aging_s
+        self.weights = weights if weights is not None else parse_weights(SCHEDULER_CATEGORY_WEIGHTS)
+        self._heap: list = []
+        self._seq = itertools.count()  # FIFO among equal priorities
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def priority(self, category: str, confidence: float) -> float:
+        """Base priority before aging."""
+        return self.weights.get(category, 1.0) * max(confidence, 0.0)
+
+    def put(self, job, category: str, confidence: float):
+        base = self.priority(category, confidence)
+        enqueued_at = time.monotonic()
+        rank = math.log2(max(base, 1e-9)) - enqueued_at / self.aging_s
+        with self._cond:
+            while len(self._heap) >= self.capacity:
+                self._cond.wait()
+            heapq.heappush(self._heap, (-rank, next(self._seq), enqueued_at, base, job))
+            self._cond.notify_all()
+
+    def get(self):
+        """Block for the highest-priority job; returns `(job, waited_s, base_priority)`."""
+        with self._cond:
+            while not self._heap:
+                self._cond.wait()
+            _, _, enqueued_at, base, job = heapq.heappop(self._heap)
+            self._cond.notify_all()
+        return job, time.monotonic() - enqueued_at, base
+
+
+class OffsetTracker:
+    """Committable positions for records handed to workers out of order.
+
+    `start` must be called in offset order within each partition (the order
+    records are polled in); jobs may finish in any order.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[str, int], deque] = {}
+        self._done: dict[tuple[str, int], set] = {}
+        self._next: dict[tuple[str, int], int] = {}
+
+    def start(self, record) -> tuple[tuple[str, int], int]:
+        """Track `record` until `done` is called with the returned token."""
+        tp = (record.topic, record.partition)
+        with self._lock:
+            self._pending.setdefault(tp, deque()).append(record.offset)
+            self._done.setdefault(tp, set())
+            self._next[tp] = max(self._next.get(tp, 0), record.offset + 1)
+        return tp, record.offset
+
+    def done(self, token: tuple[tuple[str, int], int]):
+        tp, offset = token
+        with self._lock:
+            self._done[tp].add(offset)
+
+    def committable(self) -> dict[tuple[str, int], int]:
+        """`{(topic, partition): offset}` up to which every consumed job has finished."""
+        positions = {}
+        with self._lock:
+            for tp, pending in self._pending.items():
+                done = self._done[tp]
+                while pending and pending[0] in done:
+                    done.discard(pending.popleft())
+                positions[tp] = pending[0] if pending else self._next[tp]
+        return positions
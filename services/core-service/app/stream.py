@@ -0,0 +1,108 @@
+"""In-memory fan-out of incident events to Server-Sent Events subscribers.
+
+The Kafka consumer runs in a worker thread; subscribers live on the asyncio
+event loop. `StreamHub.publish` hops onto the loop with
+`call_soon_threadsafe`, and each subscriber owns a bounded queue. A subscriber
+whose queue is full is disconnected instead of blocking the pipeline.
+"""
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field
+
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "256"))
+STREAM_MAX_SUBSCRIBERS = int(os.getenv("STREAM_MAX_SUBSCRIBERS", "10000"))
+STREAM_KEEPALIVE_S = float(os.getenv("STREAM_KEEPALIVE_S", "15"))
+
+
+@dataclass(eq=False)
+class Subscription:
+    bbox: tuple[float, float, float, float] | None = None  # min_lat, min_lon, max_lat, max_lon
+    categories: frozenset[str] = frozenset()
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=STREAM_QUEUE_SIZE))
+    dropped: bool = False
+
+    def matches(self, data: dict) -> bool:
+        if self.categories and data.get("category") not in self.categories:
+            return False
+        if self.bbox is not None:
+            lat, lon = data.get("lat"), data.get("lon")
+            if lat is None or lon is None:
+                return False
+            min_lat, min_lon, max_lat, max_lon = self.bbox
+            if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+                return False
+        return True
+
+
+class StreamHub:
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._subscribers: set[Subscription] = set()
+        self.dropped_total = 0
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def has_capacity(self) -> bool:
+        return len(self._subscribers) < STREAM_MAX_SUBSCRIBERS
+
+    def subscribe(self, sub: Subscription) -> bool:
+        if not self.has_capacity():
+            return False
+        self._subscribers.add(sub)
+        return True
+
+    def unsubscribe(self, sub: Subscription):
+        self._subscribers.discard(sub)
+
+    def publish(self, event: str, data: dict):
+        """Thread-safe: schedule delivery of one event on the event loop."""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        # Encode once, share the frame across all matching subscribers.
+        frame = f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+        loop.call_soon_threadsafe(self._fanout, data, frame)
+
+    def _fanout(self, data: dict, frame: str):
+        for sub in list(self._subscribers):
+            if not sub.matches(data):
+                continue
+            try:
+                sub.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Slow consumer: cut it loose rather than buffer without bound.
+                sub.dropped = True
+                self._subscribers.discard(sub)
+                self.dropped_total += 1
+
+    async def frames(self, sub: Subscription):
+        """Async generator of SSE frames for one subscriber.
+
+        The subscription is registered here, on the first iteration, so it is
+        always paired with the `finally` below: a client that disconnects
+        before the response starts never leaves a subscriber behind.
+        """
+        if not self.subscribe(sub):
+            yield "event: dropped\ndata: {\"reason\":\"too_many_subscribers\"}\n\n"
+            return
+        try:
+            yield ": connected\n\n"
+            while not sub.dropped:
+                try:
+                    yield await asyncio.wait_for(sub.queue.get(), timeout=STREAM_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+            # Let the client know why the stream ended so it can reconnect.
+            yield "event: dropped\ndata: {\"reason\":\"slow_consumer\"}\n\n"
+        finally:
+            self.unsubscribe(sub)
+
+
+hub = StreamHub()
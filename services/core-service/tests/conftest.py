@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Import the service as `app`, the way its image runs it.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,57 @@
+import pytest
+
+from app.clusters import HotspotAggregator
+
+LAT, LON = 40.4168, -3.7038
+
+
+@pytest.fixture
+def hotspots():
+    return HotspotAggregator(cell_deg=0.005, window_s=30, bucket_s=10, max_cells=4, min_events=3)
+
+
+def test_cluster_forms_and_absorbs_after_min_events(hotspots):
+    first = hotspots.observe(LAT, LON, "panic_motion", 0.7, "a", now=0)
+    assert not first.absorbed and first.incident_id == "a" and not first.emit
+    hotspots.observe(LAT, LON, "panic_motion", 0.7, "b", now=1)
+    third = hotspots.observe(LAT, LON, "panic_motion", 0.7, "c", now=2)
+    assert third.absorbed and third.incident_id == "a" and third.emit
+    assert third.cluster_id == first.cluster_id
+
+
+def test_higher_priority_is_dispatched_and_leads(hotspots):
+    for i, now in enumerate((0, 1, 2)):
+        hotspots.observe(LAT, LON, "panic_motion", 0.7, f"p{i}", now=now, priority=1.4)
+    urgent = hotspots.observe(LAT, LON, "acoustic_gunshot", 0.9, "g", now=3, priority=2.7)
+    assert not urgent.absorbed and urgent.incident_id == "g"
+    follower = hotspots.observe(LAT, LON, "panic_motion", 0.7, "p3", now=4, priority=1.4)
+    assert follower.absorbed and follower.incident_id == "g"
+
+
+def test_buckets_expire_out_of_the_window(hotspots):
+    hotspots.observe(LAT, LON, "acoustic_gunshot", 0.99, "a", now=0)
+    hotspots.observe(LAT, LON, "panic_motion", 0.6, "b", now=15)
+    summary = hotspots.summary(LAT, LON)
+    assert summary["count"] == 2
+    assert (summary["category"], summary["max_confidence"]) == ("acoustic_gunshot", 0.99)
+
+    hotspots.observe(LAT, LON, "panic_motion", 0.5, "c", now=31)  # bucket 0 leaves the window
+    summary = hotspots.summary(LAT, LON)
+    assert summary["count"] == 2
+    assert (summary["category"], summary["max_confidence"]) == ("panic_motion", 0.6)
+    assert summary["lat"] == pytest.approx(LAT)
+
+
+def test_expired_leader_is_replaced(hotspots):
+    for i in range(3):
+        hotspots.observe(LAT, LON, "panic_motion", 0.7, f"a{i}", now=i)
+    late = hotspots.observe(LAT, LON, "panic_motion", 0.7, "late", now=35)
+    assert not late.absorbed and late.incident_id == "late"
+
+
+def test_empty_cells_release_their_slot(hotspots):
+    for i in range(4):
+        assert hotspots.observe(LAT + i, LON, "panic_motion", 0.7, f"c{i}", now=0) is not None
+    assert hotspots.observe(LAT + 9, LON, "panic_motion", 0.7, "full", now=0) is None
+    moved = hotspots.observe(LAT + 9, LON, "panic_motion", 0.7, "later", now=60)  # all cells expired
+    assert moved is not None and moved.incident_id == "later"
@@ -0,0 +1,86 @@
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pytest
+
+from app import scheduler
+from app.scheduler import OffsetTracker, PriorityScheduler
+
+Record = namedtuple("Record", "topic partition offset")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(t=1000.0)
+    monkeypatch.setattr(scheduler, "time", SimpleNamespace(monotonic=lambda: now.t))
+    return now
+
+
+def drain(queue: PriorityScheduler) -> list:
+    return [queue.get()[0] for _ in range(len(queue))]
+
+
+def test_higher_priority_first(clock):
+    queue = PriorityScheduler(aging_s=5, weights={"gunshot": 3, "manual": 1})
+    queue.put("manual", "manual", 0.9)
+    queue.put("gunshot", "gunshot", 0.9)
+    queue.put("unknown", "unknown", 0.5)  # default weight 1
+    assert drain(queue) == ["gunshot", "manual", "unknown"]
+
+
+def test_equal_priorities_are_fifo(clock):
+    queue = PriorityScheduler(aging_s=5, weights={"manual": 1})
+    for name in ("a", "b", "c"):
+        queue.put(name, "manual", 0.7)
+    assert drain(queue) == ["a", "b", "c"]
+
+
+def test_waiting_job_ages_past_newer_higher_priority(clock):
+    queue = PriorityScheduler(aging_s=5, weights={"gunshot": 3, "manual": 1})
+    queue.put("old", "manual", 0.5)  # base 0.5
+    clock.t += 10  # two doublings: 0.5 -> 2.0, still below a fresh 3.0
+    queue.put("fresh", "gunshot", 1.0)
+    assert drain(queue) == ["fresh", "old"]
+
+    queue.put("old", "manual", 0.5)
+    clock.t += 15  # three doublings: 0.5 -> 4.0, above a fresh 3.0
+    queue.put("fresh", "gunshot", 1.0)
+    assert drain(queue) == ["old", "fresh"]
+
+
+def test_get_reports_wait_and_base_priority(clock):
+    queue = PriorityScheduler(aging_s=5, weights={"gunshot": 3})
+    queue.put("job", "gunshot", 0.5)
+    clock.t += 2.5
+    assert queue.get() == ("job", 2.5, 1.5)
+
+
+def test_offsets_commit_up_to_oldest_unfinished():
+    tracker = OffsetTracker()
+    tokens = [tracker.start(Record("anomaly", 0, offset)) for offset in (10, 11, 12)]
+    assert tracker.committable() == {("anomaly", 0): 10}
+
+    tracker.done(tokens[1])
+    tracker.done(tokens[2])
+    assert tracker.committable() == {("anomaly", 0): 10}  # 10 still in flight
+
+    tracker.done(tokens[0])
+    assert tracker.committable() == {("anomaly", 0): 13}
+
+
+def test_offsets_follow_poll_order_with_gaps():
+    tracker = OffsetTracker()
+    first = tracker.start(Record("anomaly", 0, 5))
+    second = tracker.start(Record("anomaly", 0, 9))  # offsets need not be contiguous
+    tracker.done(second)
+    assert tracker.committable() == {("anomaly", 0): 5}
+    tracker.done(first)
+    assert tracker.committable() == {("anomaly", 0): 10}
+
+
+def test_offsets_are_tracked_per_partition():
+    tracker = OffsetTracker()
+    a = tracker.start(Record("anomaly", 0, 3))
+    tracker.start(Record("anomaly", 1, 7))
+    tracker.done(a)
+    assert tracker.committable() == {("anomaly", 0): 4, ("anomaly", 1): 7}
@@ -1,10 +1,28 @@
 from concurrent import futures
 import math
+import os
 
 import grpc
+from sentinelmesh import metrics
 
 from . import dispatch_pb2, dispatch_pb2_grpc
 
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+# Clients ping every DISPATCH_GRPC_KEEPALIVE_MS; accept pings at least this often without a GOAWAY.
+GRPC_MIN_PING_INTERVAL_MS = int(os.getenv("GRPC_MIN_PING_INTERVAL_MS", "10000"))
+
+SERVER_OPTIONS = [
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.min_recv_ping_interval_without_data_ms", GRPC_MIN_PING_INTERVAL_MS),
+    ("grpc.http2.max_ping_strikes", 0),
+]
+
+ROUTE_LATENCY = metrics.Histogram(
+    "dispatch_route_seconds",
+    "Server-side GetInterceptRoute handling time.",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05),
+)
+
 
 def haversine_m(lat1, lon1, lat2, lon2):
     r = 6371000.0
@@ -17,6 +35,10 @@ def haversine_m(lat1, lon1, lat2, lon2):
 
 class DispatchSvc(dispatch_pb2_grpc.DispatchServiceServicer):
     def GetInterceptRoute(self, request, context):
+        with ROUTE_LATENCY.time():
+            return self._intercept_route(request)
+
+    def _intercept_route(self, request):
         dist = haversine_m(
             request.incident_lat,
             request.incident_lon,
@@ -39,10 +61,11 @@ class DispatchSvc(dispatch_pb2_grpc.DispatchServiceServicer):
 
 
 def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10), options=SERVER_OPTIONS)
     dispatch_pb2_grpc.add_DispatchServiceServicer_to_server(DispatchSvc(), server)
     server.add_insecure_port("[::]:50051")
     server.start()
+    metrics.start_http_server(METRICS_PORT)
     print("[dispatch-service] gRPC listening on :50051")
     server.wait_for_termination()
 
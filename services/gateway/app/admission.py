@@ -0,0 +1,144 @@
+"""Admission control for the report endpoint.
+
+Two independent gates:
+
+1. A per-citizen token bucket (`RATE_LIMIT_PER_CITIZEN_RPS`, burst
+   `RATE_LIMIT_BURST`) — a hard cap on non-emergency reports. Emergency
+   reports neither pass through it nor spend its tokens.
+2. An overload level derived from producer pressure: publishes awaiting an
+   ack (`ADMISSION_MAX_INFLIGHT`), an EWMA of publish latency against
+   `ADMISSION_LATENCY_TARGET_MS`, and optionally the ai-engine consumer lag.
+   Under `degraded`, non-emergency reports are published without waiting for
+   the broker ack; under `shedding` they are rejected with 429.
+
+Emergency reports are always accepted (and acked), whatever either gate says.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "1000"))
+ADMISSION_DEGRADE_AT = float(os.getenv("ADMISSION_DEGRADE_AT", "0.5"))
+ADMISSION_SHED_AT = float(os.getenv("ADMISSION_SHED_AT", "0.8"))
+ADMISSION_LATENCY_TARGET_MS = float(os.getenv("ADMISSION_LATENCY_TARGET_MS", "250"))
+ADMISSION_LAG_MAX = int(os.getenv("ADMISSION_LAG_MAX", "0"))  # 0 = ignore consumer lag
+ADMISSION_LAG_INTERVAL_S = float(os.getenv("ADMISSION_LAG_INTERVAL_S", "5"))
+RATE_LIMIT_PER_CITIZEN_RPS = float(os.getenv("RATE_LIMIT_PER_CITIZEN_RPS", "1"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "5"))
+RATE_LIMIT_MAX_CITIZENS = int(os.getenv("RATE_LIMIT_MAX_CITIZENS", "100000"))
+
+EWMA_ALPHA = 0.2
+EWMA_IDLE_HALF_LIFE_S = 1.0  # stale latency readings fade once acks stop arriving
+
+
+class Level(Enum):
+    NORMAL = 0
+    DEGRADED = 1
+    SHEDDING = 2
+
+
+class Decision(Enum):
+    ACCEPT = "accept"  # publish and wait for the broker ack
+    ACCEPT_ASYNC = "accept_async"  # publish without waiting (degraded)
+    RATE_LIMITED = "rate_limited"
+    SHED = "shed"
+
+
+class TokenBuckets:
+    """Per-key token buckets; the least recently seen keys are evicted first."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key: str, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] < 1.0:
+                return False
+            bucket[0] -= 1.0
+            return True
+
+
+class AdmissionController:
+    def __init__(self):
+        self.buckets = TokenBuckets(RATE_LIMIT_PER_CITIZEN_RPS, RATE_LIMIT_BURST, RATE_LIMIT_MAX_CITIZENS)
+        self.inflight = 0
+        self.latency_ewma_ms = 0.0
+        self.consumer_lag = 0
+        self._last_ack = time.monotonic()
+        self._lock = threading.Lock()
+
+    def publish_latency_ms(self) -> float:
+        idle = time.monotonic() - self._last_ack
+        return self.latency_ewma_ms * 0.5 ** (idle / EWMA_IDLE_HALF_LIFE_S)
+
+    def level(self) -> Level:
+        occupancy = self.inflight / ADMISSION_MAX_INFLIGHT
+        latency = self.publish_latency_ms() / ADMISSION_LATENCY_TARGET_MS
+        lag = self.consumer_lag / ADMISSION_LAG_MAX if ADMISSION_LAG_MAX > 0 else 0.0
+        # Latency and lag are scaled so that hitting their target equals the shed threshold.
+        pressure = max(occupancy, latency * ADMISSION_SHED_AT, lag * ADMISSION_SHED_AT)
+        if pressure >= ADMISSION_SHED_AT:
+            return Level.SHEDDING
+        if pressure >= ADMISSION_DEGRADE_AT:
+            return Level.DEGRADED
+        return Level.NORMAL
+
+    def admit(self, citizen_id: str, emergency: bool) -> Decision:
+        if emergency:
+            return Decision.ACCEPT
+        if not self.buckets.allow(citizen_id):
+            return Decision.RATE_LIMITED
+        level = self.level()
+        if level is Level.SHEDDING:
+            return Decision.SHED
+        if level is Level.DEGRADED:
+            return Decision.ACCEPT_ASYNC
+        return Decision.ACCEPT
+
+    def track(self, future):
+        """Count `future` as in flight until the broker acks or fails it."""
+        started = time.perf_counter()
+        with self._lock:
+            self.inflight += 1
+
+        def done(_):
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            with self._lock:
+                self.inflight -= 1
+                self.latency_ewma_ms = self.publish_latency_ms()
+                self.latency_ewma_ms += EWMA_ALPHA * (elapsed_ms - self.latency_ewma_ms)
+                self._last_ack = time.monotonic()
+
+        future.add_callback(done)
+        future.add_errback(done)
+        return future
+
+    def watch_consumer_lag(self, lag_fn):
+        """Refresh `consumer_lag` from `lag_fn()` in a daemon thread."""
+
+        def loop():
+            while True:
+                try:
+                    self.consumer_lag = lag_fn()
+                except Exception as exc:  # lag is advisory; keep admitting on errors
+                    print(f"[gateway] consumer lag check failed: {exc}")
+                time.sleep(ADMISSION_LAG_INTERVAL_S)
+
+        threading.Thread(target=loop, daemon=True).start()
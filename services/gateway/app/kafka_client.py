@@ -1,13 +0,0 @@
-import json
-from kafka import KafkaProducer
-
-
-def build_producer(bootstrap: str) -> KafkaProducer:
-    return KafkaProducer(
-        bootstrap_servers=bootstrap,
-        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-        key_serializer=lambda k: k.encode("utf-8") if isinstance(k, str) else k,
-        acks="all",
-        retries=5,
-        linger_ms=10,
-    )
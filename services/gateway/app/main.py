@@ -1,18 +1,46 @@
 import os
+import time
 import uuid
 from datetime import datetime, timezone
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
+from sentinelmesh import contracts, metrics
+from sentinelmesh.transport import TRANSPORT_BACKEND, build_producer
 
-from .kafka_client import build_producer
+from .admission import ADMISSION_LAG_MAX, AdmissionController, Decision
 
 KAFKA_BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP", "redpanda:9092")
 TOPIC_TELEMETRY = os.getenv("TOPIC_TELEMETRY", "telemetry.raw.v1")
+PUBLISH_TIMEOUT_S = float(os.getenv("PUBLISH_TIMEOUT_S", "5"))
+RETRY_AFTER_S = os.getenv("RETRY_AFTER_S", "1")
 
-producer = build_producer(KAFKA_BOOTSTRAP)
+producer = build_producer(KAFKA_BOOTSTRAP, linger_ms=10)
 app = FastAPI(title="SentinelMesh Gateway", version="0.1.0")
 
+ACCEPT_TO_PUBLISH = metrics.Histogram(
+    "gateway_accept_to_publish_seconds", "Time from accepting a report to its publish being flushed."
+)
+REPORTS = metrics.Counter("gateway_reports_total", "Emergency reports accepted.", ("emergency",))
+ADMISSION = metrics.Counter("gateway_admission_total", "Admission decisions.", ("decision",))
+
+admission = AdmissionController()
+if ADMISSION_LAG_MAX > 0 and TRANSPORT_BACKEND == "kafka":
+    from sentinelmesh.kafka_client import build_lag_probe
+
+    admission.watch_consumer_lag(build_lag_probe(KAFKA_BOOTSTRAP, TOPIC_TELEMETRY, "ai-engine-v1"))
+
+metrics.Gauge("gateway_publish_inflight", "Publishes awaiting a broker ack.").set_function(
+    lambda: admission.inflight
+)
+metrics.Gauge("gateway_publish_latency_ewma_ms", "EWMA of publish-to-ack latency.").set_function(
+    admission.publish_latency_ms
+)
+metrics.Gauge("gateway_admission_level", "0=normal, 1=degraded, 2=shedding.").set_function(
+    lambda: admission.level().value
+)
+
 
 class EmergencyReport(BaseModel):
     citizen_id: str = Field(..., examples=["citizen-001"])
@@ -28,8 +56,20 @@ def health():
     return {"ok": True, "service": "gateway"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.post("/v1/emergency/report")
 def report(req: EmergencyReport):
+    accepted = time.perf_counter()
+    decision = admission.admit(req.citizen_id, req.emergency)
+    ADMISSION.labels(decision=decision.value).inc()
+    if decision in (Decision.RATE_LIMITED, Decision.SHED):
+        detail = "rate_limited" if decision is Decision.RATE_LIMITED else "overloaded"
+        raise HTTPException(status_code=429, detail=detail, headers={"Retry-After": RETRY_AFTER_S})
+
     trace_id = str(uuid.uuid4())
     event = {
         "event_id": str(uuid.uuid4()),
@@ -50,12 +90,22 @@ def report(req: EmergencyReport):
         },
     }
 
-    producer.send(TOPIC_TELEMETRY, key=req.citizen_id, value=event)
-    producer.flush(timeout=5)
+    # Pydantic checked the request; this guards the envelope we build against contract drift.
+    error = contracts.validate("telemetry.raw.v1", event)
+    if error:
+        raise HTTPException(status_code=422, detail=f"contract_violation: {error}")
+
+    future = admission.track(producer.send(TOPIC_TELEMETRY, key=req.citizen_id, value=event))
+    if decision is Decision.ACCEPT:
+        # Wait for this record's ack only, instead of flushing everyone's buffered records.
+        future.get(timeout=PUBLISH_TIMEOUT_S)
+    ACCEPT_TO_PUBLISH.observe(time.perf_counter() - accepted)
+    REPORTS.labels(emergency=str(req.emergency).lower()).inc()
 
     return {
         "accepted": True,
         "trace_id": trace_id,
         "published_topic": TOPIC_TELEMETRY,
         "event_id": event["event_id"],
+        "degraded": decision is Decision.ACCEPT_ASYNC,
     }
@@ -0,0 +1,11 @@
+"""Support modules shared by every SentinelMesh service.
+
+- `transport`: pluggable event transport (Kafka, in-process memory, mmap log).
+- `kafka_client`: kafka-python producer/consumer setup behind `transport`.
+- `contracts`: compiled event-contract validators and dead-lettering.
+- `metrics`: minimal Prometheus text-format metrics.
+
+Each service image copies this package next to its `app` package (the
+Dockerfiles build from the repository root); in a checkout, put `shared/` on
+`PYTHONPATH`.
+"""
@@ -0,0 +1,229 @@
+"""Runtime enforcement of the event contracts in `contracts/events/*.json`.
+
+Every schema is compiled once, at import, into a generated Python function
+of straight-line checks (`type(v) is str`, key lookups, constant error
+strings), so validating an envelope costs a few microseconds and no
+per-event schema interpretation. The supported keywords are the subset the
+contracts use — `type` (or a list of types), `properties`, `required`,
+`const`, `enum`, `items`, `additionalProperties: false`, `minimum`,
+`maximum` — and any other validation keyword fails compilation, so a schema
+never silently loses a rule.
+
+Schemas are keyed by `$id` (`telemetry.raw.v1`, ...). Consumers validate
+each polled batch with `split_valid` and route failures — including
+records that were not JSON at all (`transport.Undecodable`) — to
+`<topic>DLQ_SUFFIX` with `dead_letter`. The schema directory is
+`CONTRACTS_DIR`, else `contracts/events` in the image (`/app`) or in the
+repository checkout.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import metrics
+from .transport import Undecodable, deliver
+
+CONTRACTS_DIR = os.getenv("CONTRACTS_DIR", "")
+DLQ_SUFFIX = os.getenv("DLQ_SUFFIX", ".dlq")
+
+EVENTS = metrics.Counter(
+    "contract_events_total", "Events checked against their contract.", ("schema", "outcome")
+)
+DEAD_LETTERS = metrics.Counter(
+    "contract_dead_letters_total", "Invalid events routed to a dead-letter topic.", ("topic",)
+)
+
+_TYPE_CHECKS = {
+    "object": "type({v}) is dict",
+    "array": "type({v}) is list",
+    "string": "type({v}) is str",
+    "integer": "type({v}) is int",
+    "number": "type({v}) is float or type({v}) is int",
+    "boolean": "type({v}) is bool",
+    "null": "{v} is None",
+}
+_KEYWORDS = {
+    "type",
+    "properties",
+    "required",
+    "const",
+    "enum",
+    "items",
+    "additionalProperties",
+    "minimum",
+    "maximum",
+}
+_ANNOTATIONS = {"$id", "$schema", "title", "description", "examples", "default"}
+_MISSING = object()
+
+
+class _Codegen:
+    def __init__(self, schema_id: str):
+        self.schema_id = schema_id
+        self.lines = ["def validate(v0):"]
+        self.namespace = {"_MISSING": _MISSING}
+        self._vars = 0
+
+    def var(self) -> str:
+        self._vars += 1
+        return f"v{self._vars}"
+
+    def constant(self, value) -> str:
+        name = f"c{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def fail(self, pad: str, message: str):
+        self.lines.append(f"{pad}    return {message!r}")
+
+    def emit(self, schema: dict, var: str, path: str, depth: int):
+        unknown = set(schema) - _KEYWORDS - _ANNOTATIONS
+        if unknown:
+            raise ValueError(f"{self.schema_id} {path}: unsupported keyword(s) {sorted(unknown)}")
+        pad = "    " * depth
+        types = schema.get("type")
+        if types is not None:
+            types = types if isinstance(types, list) else [types]
+            cond = " or ".join(_TYPE_CHECKS[t].format(v=var) for t in types)
+            self.lines.append(f"{pad}if not ({cond}):")
+            self.fail(pad, f"{path}: expected {'|'.join(types)}")
+        if "const" in schema:
+            self.lines.append(f"{pad}if {var} != {self.constant(schema['const'])}:")
+            self.fail(pad, f"{path}: expected {schema['const']!r}")
+        if "enum" in schema:
+            self.lines.append(f"{pad}if {var} not in {self.constant(tuple(schema['enum']))}:")
+            self.fail(pad, f"{path}: not one of {schema['enum']!r}")
+        for keyword, op in (("minimum", "<"), ("maximum", ">")):
+            if keyword in schema:
+                numeric = f"(type({var}) is float or type({var}) is int)"
+                self.lines.append(f"{pad}if {numeric} and {var} {op} {schema[keyword]!r}:")
+                self.fail(pad, f"{path}: {keyword} is {schema[keyword]!r}")
+
+        if {"properties", "required", "additionalProperties"} & set(schema):
+            if types == ["object"]:
+                self.emit_object(schema, var, path, pad, depth)
+            else:  # object keywords only apply to objects
+                self.lines.append(f"{pad}if type({var}) is dict:")
+                self.emit_object(schema, var, path, pad + "    ", depth + 1)
+        if "items" in schema:
+            item = self.var()
+            self.lines.append(f"{pad}if type({var}) is list:")
+            self.lines.append(f"{pad}    for {item} in {var}:")
+            self.block(schema["items"], item, f"{path}[]", depth + 2)
+
+    def emit_object(self, schema: dict, var: str, path: str, pad: str, depth: int):
+        required = schema.get("required", [])
+        for key in required:
+            self.lines.append(f"{pad}if {key!r} not in {var}:")
+            self.fail(pad, f"{path}.{key}: required")
+        properties = schema.get("properties", {})
+        if schema.get("additionalProperties") is False:
+            key = self.var()
+            self.lines.append(f"{pad}for {key} in {var}:")
+            self.lines.append(f"{pad}    if {key} not in {self.constant(frozenset(properties))}:")
+            self.lines.append(f"{pad}        return {path + ': unexpected property '!r} + repr({key})")
+        elif schema.get("additionalProperties", True) is not True:
+            raise ValueError(f"{self.schema_id} {path}: only additionalProperties: false is supported")
+        for key, subschema in properties.items():
+            child = self.var()
+            if key in required:
+                self.lines.append(f"{pad}{child} = {var}[{key!r}]")
+                self.block(subschema, child, f"{path}.{key}", depth, guard=False)
+            else:
+                self.lines.append(f"{pad}{child} = {var}.get({key!r}, _MISSING)")
+                self.lines.append(f"{pad}if {child} is not _MISSING:")
+                self.block(subschema, child, f"{path}.{key}", depth + 1)
+
+    def block(self, schema: dict, var: str, path: str, depth: int, guard: bool = True):
+        before = len(self.lines)
+        self.emit(schema, var, path, depth)
+        if guard and len(self.lines) == before:
+            self.lines.append("    " * depth + "pass")
+
+    def build(self, schema: dict):
+        self.emit(schema, "v0", "$", 1)
+        self.lines.append("    return None")
+        source = "\n".join(self.lines) + "\n"
+        exec(compile(source, f"<contract {self.schema_id}>", "exec"), self.namespace)
+        fn = self.namespace["validate"]
+        fn.source = source
+        return fn
+
+
+def compile_schema(schema: dict):
+    """Return `validate(value) -> str | None`: None if valid, else the first error."""
+    return _Codegen(schema.get("$id", "schema")).build(schema)
+
+
+def _schema_dir() -> Path:
+    if CONTRACTS_DIR:
+        return Path(CONTRACTS_DIR)
+    here = Path(__file__).resolve()
+    for candidate in (here.parents[1] / "contracts" / "events", here.parents[2] / "contracts" / "events"):
+        if candidate.is_dir():
+            return candidate
+    raise RuntimeError("contracts/events not found; set CONTRACTS_DIR")
+
+
+def load_validators(directory: Path | None = None) -> dict:
+    validators = {}
+    for path in sorted((directory or _schema_dir()).glob("*.json")):
+        schema = json.loads(path.read_text(encoding="utf-8"))
+        validators[schema.get("$id", path.stem)] = compile_schema(schema)
+    return validators
+
+
+VALIDATORS = load_validators()
+
+
+def validate(schema_id: str, value) -> str | None:
+    error = VALIDATORS[schema_id](value)
+    EVENTS.labels(schema=schema_id, outcome="invalid" if error else "valid").inc()
+    return error
+
+
+def split_valid(schema_id: str, records: list) -> tuple[list, list]:
+    """Partition consumer records by their `.value`: `(valid, [(record, error), ...])`."""
+    check = VALIDATORS[schema_id]
+    valid, invalid = [], []
+    for record in records:
+        value = record.value
+        error = value.error if type(value) is Undecodable else check(value)
+        if error is None:
+            valid.append(record)
+        else:
+            invalid.append((record, error))
+    EVENTS.labels(schema=schema_id, outcome="valid").inc(len(valid))
+    if invalid:
+        EVENTS.labels(schema=schema_id, outcome="invalid").inc(len(invalid))
+    return valid, invalid
+
+
+def dead_letter(producer, topic: str, invalid: list, service: str):
+    """Send `(record, error)` pairs (invalid or unprocessable) to `<topic><DLQ_SUFFIX>`.
+
+    Returns once the broker has acked all of them (see `transport.deliver`),
+    so callers may commit past the records afterwards.
+    """
+    dlq = topic + DLQ_SUFFIX
+    failed_at = datetime.now(timezone.utc).isoformat()
+    messages = []
+    for record, error in invalid:
+        value = {
+            "source_topic": topic,
+            "source_offset": record.offset,
+            "service": service,
+            "error": error,
+            "failed_at": failed_at,
+            "event": record.value,
+        }
+        if type(record.value) is Undecodable:
+            value["event"] = None
+            raw = record.value.raw
+            value["raw"] = None if raw is None else raw.decode("utf-8", errors="replace")
+        messages.append((dlq, record.key, value))
+        print(f"[{service}] dead-lettering {topic} offset={record.offset}: {error} -> {dlq}")
+    deliver(producer, messages)
+    DEAD_LETTERS.labels(topic=topic).inc(len(invalid))
@@ -0,0 +1,42 @@
+import json
+from kafka import KafkaAdminClient, KafkaConsumer, KafkaProducer
+
+from .transport import decode_value
+
+
+def build_producer(bootstrap: str, **options) -> KafkaProducer:
+    """`options` are extra `KafkaProducer` settings (e.g. the gateway's `linger_ms`)."""
+    return KafkaProducer(
+        bootstrap_servers=bootstrap,
+        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+        key_serializer=lambda k: k.encode("utf-8") if isinstance(k, str) else k,
+        acks="all",
+        retries=5,
+        **options,
+    )
+
+
+def build_consumer(bootstrap: str, topic: str, group_id: str, enable_auto_commit: bool = True) -> KafkaConsumer:
+    return KafkaConsumer(
+        topic,
+        bootstrap_servers=bootstrap,
+        group_id=group_id,
+        enable_auto_commit=enable_auto_commit,
+        auto_offset_reset="earliest",
+        value_deserializer=decode_value,  # malformed records come back as `Undecodable`
+    )
+
+
+def build_lag_probe(bootstrap: str, topic: str, group_id: str):
+    """Return a callable giving the total lag of `group_id` on `topic`."""
+    admin = KafkaAdminClient(bootstrap_servers=bootstrap)
+    offsets = KafkaConsumer(bootstrap_servers=bootstrap)
+
+    def lag() -> int:
+        committed = {tp: meta for tp, meta in admin.list_consumer_group_offsets(group_id).items() if tp.topic == topic}
+        if not committed:
+            return 0
+        ends = offsets.end_offsets(list(committed))
+        return sum(max(ends[tp] - meta.offset, 0) for tp, meta in committed.items())
+
+    return lag
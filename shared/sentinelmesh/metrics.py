@@ -0,0 +1,228 @@
+"""Minimal Prometheus text-format metrics.
+
+Hot-path updates never take a lock: every thread increments its own shard
+(a plain list held in `threading.local`), and a scrape sums all shards. The
+only lock guards shard registration, which happens once per thread.
+"""
+
+import bisect
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_families: list["_Family"] = []
+_families_lock = threading.Lock()
+
+
+class _Shards:
+    """Per-thread float vectors that are summed on read."""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._all: list[list[float]] = []
+        self._lock = threading.Lock()
+
+    def mine(self) -> list[float]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = [0.0] * self._size
+            with self._lock:
+                self._all.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def total(self) -> list[float]:
+        with self._lock:
+            shards = list(self._all)
+        out = [0.0] * self._size
+        for shard in shards:
+            for i, v in enumerate(shard):
+                out[i] += v
+        return out
+
+
+class _Timer:
+    __slots__ = ("_observe", "_start")
+
+    def __init__(self, observe):
+        self._observe = observe
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._observe(time.perf_counter() - self._start)
+        return False
+
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1.0):
+        self._shards.mine()[0] += amount
+
+    def samples(self, name: str, labels: str):
+        return [(f"{name}{labels}", self._shards.total()[0])]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+        self._value = 0.0
+        self._fn = None
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1.0):
+        self._shards.mine()[0] += amount
+
+    def dec(self, amount: float = 1.0):
+        self._shards.mine()[0] -= amount
+
+    def set_function(self, fn):
+        """Compute the value at scrape time (e.g. a queue length)."""
+        self._fn = fn
+
+    def samples(self, name: str, labels: str):
+        value = self._fn() if self._fn is not None else self._value + self._shards.total()[0]
+        return [(f"{name}{labels}", value)]
+
+
+class _HistogramChild:
+    def __init__(self, buckets: tuple[float, ...]):
+        self._buckets = buckets
+        # Layout: one slot per bucket, one for +Inf, one for the running sum.
+        self._shards = _Shards(len(buckets) + 2)
+
+    def observe(self, value: float):
+        shard = self._shards.mine()
+        shard[bisect.bisect_left(self._buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self) -> _Timer:
+        return _Timer(self.observe)
+
+    def samples(self, name: str, labels: str):
+        totals = self._shards.total()
+        inner = labels[1:-1]
+        sep = "," if inner else ""
+        out, cumulative = [], 0.0
+        for le, count in zip((*self._buckets, "+Inf"), totals[:-1]):
+            cumulative += count
+            out.append((f'{name}_bucket{{{inner}{sep}le="{le}"}}', cumulative))
+        out.append((f"{name}_count{labels}", cumulative))
+        out.append((f"{name}_sum{labels}", totals[-1]))
+        return out
+
+
+class _Family:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        with _families_lock:
+            _families.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwvalues):
+        key = tuple(str(v) for v in values) or tuple(str(kwvalues[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            labels = ",".join(f'{n}="{v}"' for n, v in zip(self.labelnames, key))
+            for sample, value in child.samples(self.name, f"{{{labels}}}" if labels else ""):
+                lines.append(f"{sample} {float(value)!r}")
+        return lines
+
+    def __getattr__(self, attr):
+        # Unlabelled families proxy observe/inc/set/... to their single child.
+        if self.labelnames or attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.labels(), attr)
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(_Family):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self._buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self._buckets)
+
+
+def render() -> str:
+    with _families_lock:
+        families = list(_families)
+    lines: list[str] = []
+    for family in families:
+        lines.extend(family.render())
+    return "\n".join(lines) + "\n"
+
+
+def seconds_since(iso_timestamp: str | None) -> float | None:
+    """Wall-clock age of an ISO-8601 `occurred_at` value, or None if unparsable."""
+    if not iso_timestamp:
+        return None
+    try:
+        return time.time() - datetime.fromisoformat(iso_timestamp).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port: int) -> ThreadingHTTPServer:
+    """Serve `/metrics` from a daemon thread (for services without an HTTP API)."""
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
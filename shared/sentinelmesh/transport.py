@@ -0,0 +1,558 @@
+"""Pluggable event transport.
+
+`build_producer` / `build_consumer` keep the `kafka_client` signatures and
+return objects with the kafka-python surface the services use:
+`producer.send(topic, key=, value=)` (returns a future with `.get()`),
+`producer.flush()`, and iteration over records with `.key` / `.value`, or
+`consumer.poll(timeout_ms=, max_records=)` for batches (see `iter_batches`).
+`build_consumer(..., auto_commit=False)` leaves committing to the caller via
+`commit_offsets` (Kafka semantics: the committed offset is the next record
+to read).
+
+Backends, selected with `TRANSPORT_BACKEND`:
+- `kafka`  -> `kafka_client` (default; Redpanda/Kafka).
+- `memory` -> in-process topics on one `MemoryBus`, shared by every service
+  running in the same interpreter.
+- `log`    -> append-only log under `TRANSPORT_LOG_DIR`, one directory per
+  topic made of preallocated, memory-mapped segment files. Works across
+  processes on one host (edge nodes) without a broker. Whenever a producer
+  rolls to a new segment it deletes the segments every consumer group has
+  checkpointed past and, with `TRANSPORT_LOG_RETENTION_SEGMENTS > 0`, all but
+  that many newest ones even if a group lags (the group then skips ahead).
+
+The memory and log backends keep a single partition per topic and one offset
+per consumer group; each group is meant to have a single consumer.
+"""
+
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+TRANSPORT_BACKEND = os.getenv("TRANSPORT_BACKEND", "kafka").lower()
+TRANSPORT_LOG_DIR = os.getenv("TRANSPORT_LOG_DIR", "/var/lib/sentinelmesh/log")
+TRANSPORT_LOG_SEGMENT_BYTES = int(os.getenv("TRANSPORT_LOG_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+TRANSPORT_LOG_FSYNC = os.getenv("TRANSPORT_LOG_FSYNC", "0") == "1"
+TRANSPORT_LOG_RETENTION_SEGMENTS = int(os.getenv("TRANSPORT_LOG_RETENTION_SEGMENTS", "0"))
+TRANSPORT_FLUSH_TIMEOUT_S = float(os.getenv("TRANSPORT_FLUSH_TIMEOUT_S", "10"))
+TRANSPORT_RETRY_BASE_S = float(os.getenv("TRANSPORT_RETRY_BASE_S", "0.5"))
+TRANSPORT_RETRY_MAX_S = float(os.getenv("TRANSPORT_RETRY_MAX_S", "30"))
+
+Record = namedtuple("Record", "topic partition offset key value")
+
+
+def _encode_key(key) -> bytes | None:
+    return key.encode("utf-8") if isinstance(key, str) else key
+
+
+def _encode_value(value) -> bytes:
+    return json.dumps(value).encode("utf-8")
+
+
+class Undecodable:
+    """Value of a record that is not UTF-8 JSON (`raw` is None for a tombstone).
+
+    Decoding never raises, so one malformed record cannot kill a consumer
+    loop; `contracts.split_valid` routes these to the dead-letter topic.
+    """
+
+    __slots__ = ("raw", "error")
+
+    def __init__(self, raw: bytes | None, error: str):
+        self.raw = raw
+        self.error = error
+
+
+def decode_value(raw: bytes | None):
+    # kafka-python hands null-valued records (tombstones) to the deserializer as None.
+    if raw is None:
+        return Undecodable(None, "undecodable: null value")
+    if not isinstance(raw, (bytes, bytearray, memoryview)):
+        return Undecodable(None, f"undecodable: {type(raw).__name__} value")
+    try:
+        return json.loads(bytes(raw).decode("utf-8"))
+    except ValueError as exc:  # UnicodeDecodeError and JSONDecodeError both subclass it
+        return Undecodable(bytes(raw), f"undecodable: {exc}")
+
+
+class _Sent:
+    """Already-completed send future (memory/log appends are synchronous)."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def get(self, timeout=None):
+        return self.value
+
+    def add_callback(self, fn, *args, **kwargs):
+        fn(self.value, *args, **kwargs)
+        return self
+
+    def add_errback(self, fn, *args, **kwargs):
+        return self
+
+
+# --- memory backend ---------------------------------------------------------
+
+
+class _MemoryTopic:
+    def __init__(self):
+        self.log: list[tuple[bytes | None, bytes]] = []
+        self.cond = threading.Condition()
+        self.offsets: dict[str, int] = {}
+
+
+class MemoryBus:
+    """Process-local topics. Values are stored JSON-encoded, like on the wire."""
+
+    def __init__(self):
+        self._topics: dict[str, _MemoryTopic] = {}
+        self._lock = threading.Lock()
+
+    def topic(self, name: str) -> _MemoryTopic:
+        with self._lock:
+            return self._topics.setdefault(name, _MemoryTopic())
+
+    def append(self, name: str, key: bytes | None, value: bytes) -> int:
+        t = self.topic(name)
+        with t.cond:
+            t.log.append((key, value))
+            t.cond.notify_all()
+            return len(t.log) - 1
+
+
+_memory_bus: MemoryBus | None = None
+
+
+def _bus() -> MemoryBus:
+    global _memory_bus
+    if _memory_bus is None:
+        _memory_bus = MemoryBus()
+    return _memory_bus
+
+
+class MemoryProducer:
+    def __init__(self, bus: MemoryBus):
+        self._bus = bus
+
+    def send(self, topic, key=None, value=None):
+        return _Sent(self._bus.append(topic, _encode_key(key), _encode_value(value)))
+
+    def flush(self, timeout=None):
+        pass
+
+
+class MemoryConsumer:
+    """Topics die with the process, so commits are no-ops: the group position is all there is."""
+
+    def __init__(self, bus: MemoryBus, topic: str, group_id: str):
+        self._name = topic
+        self._topic = bus.topic(topic)
+        self._group = group_id
+        with self._topic.cond:
+            self._topic.offsets.setdefault(group_id, 0)
+
+    def __iter__(self):
+        t = self._topic
+        while True:
+            with t.cond:
+                while t.offsets[self._group] >= len(t.log):
+                    t.cond.wait()
+                offset = t.offsets[self._group]
+                t.offsets[self._group] = offset + 1
+                key, raw = t.log[offset]
+            yield Record(self._name, 0, offset, key, decode_value(raw))
+
+    def poll(self, timeout_ms=0, max_records=500):
+        t = self._topic
+        deadline = time.monotonic() + timeout_ms / 1000.0
+        with t.cond:
+            while t.offsets[self._group] >= len(t.log):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return {}
+                t.cond.wait(remaining)
+            start = t.offsets[self._group]
+            end = min(len(t.log), start + max_records)
+            t.offsets[self._group] = end
+            raw = t.log[start:end]
+        records = [Record(self._name, 0, start + i, key, decode_value(v)) for i, (key, v) in enumerate(raw)]
+        return {(self._name, 0): records}
+
+    def commit(self, offsets=None):
+        pass
+
+
+# --- log backend --------------------------------------------------------------
+#
+# Segment `NNNNNNNNNN.seg` is a zero-filled file of TRANSPORT_LOG_SEGMENT_BYTES.
+# Each record is `<u32 body_len><u16 key_len><key><value>`; a zero length marks
+# the end of written data and ROLL marks "continue in the next segment". The
+# body is written before its length, so a reader never sees a partial record.
+
+_HEADER = struct.Struct("<I")
+_KEY_LEN = struct.Struct("<H")
+_ROLL = 0xFFFFFFFF
+
+
+class _Segments:
+    """Memory-mapped segment files of one topic directory."""
+
+    def __init__(self, directory: Path, size: int):
+        self.directory = directory
+        self.size = size
+        self._maps: dict[int, mmap.mmap] = {}
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, index: int) -> Path:
+        return self.directory / f"{index:010d}.seg"
+
+    def indices(self) -> list[int]:
+        return sorted(int(p.stem) for p in self.directory.glob("*.seg"))
+
+    def release(self, index: int):
+        mm = self._maps.pop(index, None)
+        if mm is not None:
+            mm.close()
+
+    def trim(self, keep: int = 0) -> list[int]:
+        """Delete segments no consumer group needs any more; returns their indices.
+
+        A group needs everything from the segment in its `.offset` checkpoint
+        on. Without any checkpoint nothing is deleted for the groups' sake, so
+        a consumer started later still sees the topic from the beginning.
+        `keep > 0` caps the topic at its `keep` newest segments regardless.
+        The newest segment is never deleted. Callers hold the topic lock.
+        """
+        indices = self.indices()
+        if len(indices) <= 1:
+            return []
+        checkpoints = []
+        for path in self.directory.glob("*.offset"):
+            try:
+                checkpoints.append(int(path.read_text().split()[0]))
+            except (OSError, ValueError, IndexError):
+                return []  # unreadable checkpoint: keep everything
+        floor = min(checkpoints) if checkpoints else indices[0]
+        if keep > 0:
+            floor = max(floor, indices[-1] - keep + 1)
+        floor = min(floor, indices[-1])
+        deleted = [index for index in indices if index < floor]
+        for index in deleted:
+            self.release(index)
+            self.path(index).unlink(missing_ok=True)
+        return deleted
+
+    def live(self, index: int) -> int:
+        """`index`, or the newest segment if a trim already deleted `index`.
+
+        Writers use this so they never recreate a segment behind the tail and
+        append records no consumer will read. Callers hold the topic lock.
+        """
+        if self.path(index).exists():
+            return index
+        self.release(index)
+        newest = self.indices()[-1:]
+        return newest[0] if newest and newest[0] > index else index
+
+    def get(self, index: int, create: bool) -> mmap.mmap | None:
+        mm = self._maps.get(index)
+        if mm is not None:
+            return mm
+        path = self.path(index)
+        if not path.exists():
+            if not create:
+                return None
+            with open(path, "ab") as f:
+                if f.tell() == 0:
+                    f.truncate(self.size)
+        with open(path, "r+b") as f:
+            if os.fstat(f.fileno()).st_size < self.size:
+                return None  # another process is still preallocating it
+            mm = mmap.mmap(f.fileno(), self.size)
+        self._maps[index] = mm
+        return mm
+
+
+class LogProducer:
+    def __init__(self, root: Path, segment_bytes: int):
+        self._root = root
+        self._segment_bytes = segment_bytes
+        self._topics: dict[str, tuple[_Segments, list[int], object]] = {}
+        self._lock = threading.Lock()
+
+    def _topic(self, topic: str):
+        state = self._topics.get(topic)
+        if state is None:
+            segments = _Segments(self._root / topic, self._segment_bytes)
+            lock_file = open(segments.directory / ".lock", "a+b")
+            # Start at the newest segment; earlier ones are complete (or deleted).
+            newest = segments.indices()[-1:] or [0]
+            state = self._topics[topic] = (segments, [newest[0], 0], lock_file)
+        return state
+
+    def send(self, topic, key=None, value=None):
+        key = _encode_key(key) or b""
+        body = _KEY_LEN.pack(len(key)) + key + _encode_value(value)
+        if len(body) + 2 * _HEADER.size > self._segment_bytes:
+            raise ValueError(f"record of {len(body)} bytes exceeds TRANSPORT_LOG_SEGMENT_BYTES")
+
+        with self._lock:
+            segments, tail, lock_file = self._topic(topic)
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # serialize appends across processes
+            try:
+                index, pos = tail
+                live = segments.live(index)
+                if live != index:  # another writer rolled on and trimmed our segment
+                    index, pos = live, 0
+                mm = segments.get(index, create=True)
+                # Skip past anything other writers appended since our last send.
+                while True:
+                    (length,) = _HEADER.unpack_from(mm, pos)
+                    if length == 0:
+                        break
+                    if length == _ROLL:
+                        segments.release(index)
+                        index, pos = segments.live(index + 1), 0
+                        mm = segments.get(index, create=True)
+                        continue
+                    pos += _HEADER.size + length
+                if pos + 2 * _HEADER.size + len(body) > segments.size:
+                    _HEADER.pack_into(mm, pos, _ROLL)
+                    segments.release(index)
+                    index, pos = index + 1, 0
+                    mm = segments.get(index, create=True)
+                    segments.trim(TRANSPORT_LOG_RETENTION_SEGMENTS)
+                mm[pos + _HEADER.size : pos + _HEADER.size + len(body)] = body
+                _HEADER.pack_into(mm, pos, len(body))
+                offset = index * segments.size + pos
+                tail[:] = [index, pos + _HEADER.size + len(body)]
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return _Sent(offset)
+
+    def flush(self, timeout=None):
+        if not TRANSPORT_LOG_FSYNC:
+            return
+        with self._lock:
+            for segments, _, _ in self._topics.values():
+                for mm in segments._maps.values():
+                    mm.flush()
+
+
+class LogConsumer:
+    """Tails one topic; the group's position is checkpointed to `<group>.offset`.
+
+    Record offsets are byte positions (`segment * size + pos`). A committed
+    offset may point inside a record (`offset + 1` of the last one processed);
+    on startup the reader advances to the first record starting at or after it.
+    """
+
+    COMMIT_EVERY = 100
+    COMMIT_INTERVAL_S = 1.0
+
+    def __init__(self, root: Path, segment_bytes: int, topic: str, group_id: str, auto_commit: bool = True):
+        self._name = topic
+        self._segments = _Segments(root / topic, segment_bytes)
+        self._offset_path = self._segments.directory / f"{group_id}.offset"
+        self._auto_commit = auto_commit
+        self._index, self._pos = 0, 0
+        if self._offset_path.exists():
+            index, pos = map(int, self._offset_path.read_text().split())
+            self._seek(index, pos)
+        self._pending, self._polled, self._last_commit = 0, 0, time.monotonic()
+
+    def _seek(self, index: int, target: int):
+        self._index, self._pos = index, 0
+        mm = self._segments.get(index, create=False)
+        if mm is None:
+            return  # not written yet, or trimmed: `_next` sorts it out
+        while self._pos < target:
+            (length,) = _HEADER.unpack_from(mm, self._pos)
+            if length == 0:
+                return
+            if length == _ROLL:
+                self._index, self._pos = index + 1, 0
+                return
+            self._pos += _HEADER.size + length
+
+    def _write_checkpoint(self, index: int, pos: int):
+        tmp = self._offset_path.with_suffix(".tmp")
+        tmp.write_text(f"{index} {pos}")
+        os.replace(tmp, self._offset_path)
+
+    def _commit(self):
+        self._write_checkpoint(self._index, self._pos)
+
+    def commit(self, offsets=None):
+        """Checkpoint `{(topic, 0): next_offset}`, or everything polled so far."""
+        offset = (offsets or {}).get((self._name, 0))
+        if offset is None:
+            self._commit()
+        else:
+            self._write_checkpoint(*divmod(offset, self._segments.size))
+        self._pending, self._last_commit = 0, time.monotonic()
+
+    def _checkpoint(self, force: bool = False):
+        if not self._pending or not self._auto_commit:
+            return
+        due = self._pending >= self.COMMIT_EVERY or time.monotonic() - self._last_commit >= self.COMMIT_INTERVAL_S
+        if force or due:
+            self._commit()
+            self._pending, self._last_commit = 0, time.monotonic()
+
+    def _next(self) -> Record | None:
+        """Read the record at the current position; None at the end of written data."""
+        while True:
+            mm = self._segments.get(self._index, create=False)
+            if mm is None:
+                indices = self._segments.indices()
+                if indices and indices[0] > self._index:  # trimmed while this group lagged
+                    print(f"[transport] {self._name}: segments before {indices[0]} were deleted, skipping ahead")
+                    self._index, self._pos = indices[0], 0
+                    continue
+                return None
+            length = _HEADER.unpack_from(mm, self._pos)[0]
+            if length == 0:
+                return None
+            if length != _ROLL:
+                break
+            self._segments.release(self._index)
+            self._index, self._pos = self._index + 1, 0
+
+        start = self._pos + _HEADER.size
+        (key_len,) = _KEY_LEN.unpack_from(mm, start)
+        key = bytes(mm[start + _KEY_LEN.size : start + _KEY_LEN.size + key_len]) or None
+        raw = bytes(mm[start + _KEY_LEN.size + key_len : start + length])
+        offset = self._index * self._segments.size + self._pos
+        self._pos = start + length
+        return Record(self._name, 0, offset, key, decode_value(raw))
+
+    def __iter__(self):
+        idle = 0.0005
+        while True:
+            record = self._next()
+            if record is None:
+                self._checkpoint(force=True)
+                time.sleep(idle)
+                idle = min(idle * 2, 0.02)
+                continue
+            idle = 0.0005
+            yield record
+            self._pending += 1
+            self._checkpoint()
+
+    def poll(self, timeout_ms=0, max_records=500):
+        # Like kafka auto-commit: a batch counts as processed once the next poll starts.
+        self._pending += self._polled
+        self._checkpoint()
+        deadline = time.monotonic() + timeout_ms / 1000.0
+        idle = 0.0005
+        records = []
+        while len(records) < max_records:
+            record = self._next()
+            if record is not None:
+                records.append(record)
+                continue
+            remaining = deadline - time.monotonic()
+            if records or remaining <= 0:
+                break
+            self._checkpoint(force=True)
+            time.sleep(min(idle, remaining))
+            idle = min(idle * 2, 0.02)
+        self._polled = len(records)
+        return {(self._name, 0): records} if records else {}
+
+
+# --- factory ------------------------------------------------------------------
+
+
+def deliver(producer, messages: list[tuple[str, object, object]], sent: list | None = None):
+    """Block until the broker has acked every `(topic, key, value)` in `messages`.
+
+    `sent` optionally holds the futures of messages already handed to
+    `producer.send`, in the same order. Each round flushes with a bounded
+    `TRANSPORT_FLUSH_TIMEOUT_S`, then resends whatever failed or is still
+    unconfirmed after an exponential backoff. A resend after a slow but
+    eventually successful delivery duplicates the message (at-least-once).
+    """
+    futures = list(sent or [])
+    attempt = 0
+    while messages:
+        for topic, key, value in messages[len(futures) :]:
+            try:
+                futures.append(producer.send(topic, key=key, value=value))
+            except Exception as exc:  # e.g. metadata unavailable: retried next round
+                futures.append(exc)
+        try:
+            producer.flush(timeout=TRANSPORT_FLUSH_TIMEOUT_S)
+        except Exception:  # unconfirmed futures are resent below
+            pass
+        failed, error = [], None
+        for message, future in zip(messages, futures):
+            try:
+                if isinstance(future, Exception):
+                    raise future
+                future.get(timeout=0)
+            except Exception as exc:
+                failed.append(message)
+                error = exc
+        if not failed:
+            return
+        attempt += 1
+        delay = min(TRANSPORT_RETRY_MAX_S, TRANSPORT_RETRY_BASE_S * 2 ** (attempt - 1))
+        print(f"[transport] {len(failed)} send(s) not acked ({error!r}); resending in {delay:.1f}s")
+        time.sleep(delay)
+        messages, futures = failed, []
+
+
+def iter_batches(consumer, max_records: int, timeout_ms: int):
+    """Yield non-empty lists of up to `max_records` records.
+
+    A batch holds whatever is already available, so it grows with backlog and
+    never waits for more records once it has one; `timeout_ms` only bounds
+    each idle poll.
+    """
+    while True:
+        polled = consumer.poll(timeout_ms=timeout_ms, max_records=max_records)
+        batch = [record for records in polled.values() for record in records]
+        if batch:
+            yield batch
+
+
+def build_producer(bootstrap: str, **kafka_options):
+    """`kafka_options` are extra `KafkaProducer` settings, ignored by the other backends."""
+    if TRANSPORT_BACKEND == "memory":
+        return MemoryProducer(_bus())
+    if TRANSPORT_BACKEND == "log":
+        return LogProducer(Path(TRANSPORT_LOG_DIR), TRANSPORT_LOG_SEGMENT_BYTES)
+    from . import kafka_client
+
+    return kafka_client.build_producer(bootstrap, **kafka_options)
+
+
+def build_consumer(bootstrap: str, topic: str, group_id: str, auto_commit: bool = True):
+    if TRANSPORT_BACKEND == "memory":
+        return MemoryConsumer(_bus(), topic, group_id)
+    if TRANSPORT_BACKEND == "log":
+        return LogConsumer(Path(TRANSPORT_LOG_DIR), TRANSPORT_LOG_SEGMENT_BYTES, topic, group_id, auto_commit)
+    from . import kafka_client
+
+    return kafka_client.build_consumer(bootstrap, topic, group_id, enable_auto_commit=auto_commit)
+
+
+def commit_offsets(consumer, offsets: dict[tuple[str, int], int]):
+    """Commit `{(topic, partition): next offset to read}` on any backend."""
+    if isinstance(consumer, (MemoryConsumer, LogConsumer)):
+        consumer.commit(offsets)
+        return
+    from kafka import OffsetAndMetadata, TopicPartition
+
+    consumer.commit({TopicPartition(t, p): OffsetAndMetadata(o, "") for (t, p), o in offsets.items()})
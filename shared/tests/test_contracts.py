@@ -0,0 +1,101 @@
+import copy
+
+import pytest
+
+from sentinelmesh import contracts
+from sentinelmesh.transport import Record, decode_value
+
+TELEMETRY = {
+    "event_id": "e-1",
+    "event_type": "telemetry.raw",
+    "schema_version": "v1",
+    "occurred_at": "2026-01-01T00:00:00+00:00",
+    "source": "gateway",
+    "trace_id": "t-1",
+    "payload": {
+        "citizen_id": "c-1",
+        "lat": 40.4,
+        "lon": -3,
+        "emergency": False,
+        "signals": {"audio_signature": None, "panic_motion": True},
+    },
+}
+
+
+def telemetry(**changes) -> dict:
+    event = copy.deepcopy(TELEMETRY)
+    for path, value in changes.items():
+        *parents, key = path.split("__")
+        target = event
+        for name in parents:
+            target = target[name]
+        if value is KeyError:
+            del target[key]
+        else:
+            target[key] = value
+    return event
+
+
+def test_every_contract_compiles():
+    assert {"telemetry.raw.v1", "anomaly.high_confidence.v1", "dispatch.route_assigned.v1"} <= set(
+        contracts.VALIDATORS
+    )
+
+
+def test_valid_envelope_passes():
+    assert contracts.validate("telemetry.raw.v1", TELEMETRY) is None
+
+
+@pytest.mark.parametrize(
+    "changes, error",
+    [
+        ({"trace_id": KeyError}, "$.trace_id: required"),
+        ({"event_type": "other"}, "$.event_type: expected 'telemetry.raw'"),
+        ({"payload__lat": True}, "$.payload.lat: expected number"),  # bool is not a number
+        ({"payload__lat": "40.4"}, "$.payload.lat: expected number"),
+        ({"payload__signals__audio_signature": 3}, "$.payload.signals.audio_signature: expected string|null"),
+        ({"payload__emergency": KeyError}, "$.payload.emergency: required"),
+    ],
+)
+def test_invalid_envelope_reports_path(changes, error):
+    assert contracts.validate("telemetry.raw.v1", telemetry(**changes)) == error
+
+
+def test_non_object_envelope():
+    assert contracts.validate("telemetry.raw.v1", []) == "$: expected object"
+
+
+def test_generated_bounds_and_closed_objects():
+    check = contracts.compile_schema(
+        {
+            "type": "object",
+            "additionalProperties": False,
+            "properties": {
+                "n": {"type": "integer", "minimum": 0, "maximum": 9},
+                "tags": {"items": {"enum": ["a"]}},
+            },
+        }
+    )
+    assert check({"n": 3, "tags": ["a"]}) is None
+    assert check({"n": -1}) == "$.n: minimum is 0"
+    assert check({"n": 10}) == "$.n: maximum is 9"
+    assert check({"extra": 1}) == "$: unexpected property 'extra'"
+    assert check({"tags": ["b"]}) is not None
+
+
+def test_unsupported_keyword_fails_compilation():
+    with pytest.raises(ValueError, match="unsupported keyword"):
+        contracts.compile_schema({"type": "string", "pattern": "^x"})
+
+
+def test_split_valid_routes_undecodable_records():
+    records = [
+        Record("telemetry.raw.v1", 0, 0, None, TELEMETRY),
+        Record("telemetry.raw.v1", 0, 1, None, telemetry(source=1)),
+        Record("telemetry.raw.v1", 0, 2, None, decode_value(b"not json")),
+        Record("telemetry.raw.v1", 0, 3, None, decode_value(None)),
+    ]
+    valid, invalid = contracts.split_valid("telemetry.raw.v1", records)
+    assert [r.offset for r in valid] == [0]
+    routed = [(r.offset, error.split(":")[0]) for r, error in invalid]
+    assert routed == [(1, "$.source"), (2, "undecodable"), (3, "undecodable")]
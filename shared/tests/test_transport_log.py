@@ -0,0 +1,99 @@
+import pytest
+
+from sentinelmesh import transport
+from sentinelmesh.transport import LogConsumer, LogProducer
+
+SEGMENT = 1024
+TOPIC = "telemetry.raw.v1"
+
+
+@pytest.fixture(autouse=True)
+def no_retention_cap(monkeypatch):
+    monkeypatch.setattr(transport, "TRANSPORT_LOG_RETENTION_SEGMENTS", 0)
+
+
+def produce(producer, first: int, count: int):
+    for i in range(first, first + count):
+        producer.send(TOPIC, key=f"k{i}", value={"seq": i, "pad": "x" * 40})
+
+
+def drain(consumer) -> list:
+    records = []
+    while batch := [r for rs in consumer.poll(timeout_ms=0, max_records=64).values() for r in rs]:
+        records += batch
+    return records
+
+
+def segments(root) -> list[int]:
+    return sorted(int(p.stem) for p in (root / TOPIC).glob("*.seg"))
+
+
+def test_round_trip_and_segment_roll(tmp_path):
+    produce(LogProducer(tmp_path, SEGMENT), 0, 60)
+    assert len(segments(tmp_path)) > 1
+    records = drain(LogConsumer(tmp_path, SEGMENT, TOPIC, "g", auto_commit=False))
+    assert [r.value["seq"] for r in records] == list(range(60))
+    assert records[0].key == b"k0"
+    assert [r.offset for r in records] == sorted(r.offset for r in records)
+
+
+def test_manual_commit_resumes_at_next_record(tmp_path):
+    produce(LogProducer(tmp_path, SEGMENT), 0, 60)
+    records = drain(LogConsumer(tmp_path, SEGMENT, TOPIC, "g", auto_commit=False))
+    LogConsumer(tmp_path, SEGMENT, TOPIC, "g", auto_commit=False).commit({(TOPIC, 0): records[41].offset + 1})
+
+    resumed = drain(LogConsumer(tmp_path, SEGMENT, TOPIC, "g", auto_commit=False))
+    assert [r.value["seq"] for r in resumed] == list(range(42, 60))
+
+
+def test_uncommitted_manual_consumer_replays(tmp_path):
+    produce(LogProducer(tmp_path, SEGMENT), 0, 10)
+    drain(LogConsumer(tmp_path, SEGMENT, TOPIC, "g", auto_commit=False))
+    assert len(drain(LogConsumer(tmp_path, SEGMENT, TOPIC, "g", auto_commit=False))) == 10
+
+
+def test_trim_keeps_segments_a_group_still_needs(tmp_path):
+    producer = LogProducer(tmp_path, SEGMENT)
+    produce(producer, 0, 60)
+    produce(producer, 60, 60)
+    assert segments(tmp_path)[0] == 0  # no checkpoint yet: nothing is deleted
+
+    consumer = LogConsumer(tmp_path, SEGMENT, TOPIC, "g", auto_commit=False)
+    records = drain(consumer)
+    consumer.commit()
+    produce(producer, 120, 60)  # rolling on trims what "g" has checkpointed past
+    assert segments(tmp_path)[0] == records[-1].offset // SEGMENT
+
+    assert [r.value["seq"] for r in drain(consumer)] == list(range(120, 180))
+
+
+def test_retention_cap_makes_a_lagging_group_skip_ahead(tmp_path, monkeypatch):
+    monkeypatch.setattr(transport, "TRANSPORT_LOG_RETENTION_SEGMENTS", 2)
+    lagging = LogConsumer(tmp_path, SEGMENT, TOPIC, "lagging", auto_commit=False)
+    lagging.commit({(TOPIC, 0): 0})
+    produce(LogProducer(tmp_path, SEGMENT), 0, 200)
+    assert len(segments(tmp_path)) == 2
+
+    lagging = LogConsumer(tmp_path, SEGMENT, TOPIC, "lagging", auto_commit=False)
+    seqs = [r.value["seq"] for r in drain(lagging)]
+    assert seqs[-1] == 199 and seqs[0] > 0
+    assert seqs == list(range(seqs[0], 200))
+
+
+def test_idle_producer_skips_segments_trimmed_by_another(tmp_path, monkeypatch):
+    monkeypatch.setattr(transport, "TRANSPORT_LOG_RETENTION_SEGMENTS", 2)
+    idle, busy = LogProducer(tmp_path, SEGMENT), LogProducer(tmp_path, SEGMENT)
+    idle.send(TOPIC, value={"seq": -1})
+    produce(busy, 0, 200)  # rolls past and trims the idle producer's segment
+    kept = segments(tmp_path)
+
+    idle.send(TOPIC, value={"seq": 200})
+    assert segments(tmp_path) == kept  # the trimmed segment is not recreated
+    records = drain(LogConsumer(tmp_path, SEGMENT, TOPIC, "g", auto_commit=False))
+    assert records[-1].value["seq"] == 200
+
+
+def test_undecodable_records_do_not_raise():
+    assert isinstance(transport.decode_value(b"\xff{"), transport.Undecodable)
+    assert transport.decode_value(None).raw is None  # kafka tombstone
+    assert transport.decode_value(b'{"a": 1}') == {"a": 1}